@@ -0,0 +1,217 @@
+from datetime import timedelta
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from database import DashboardRollup, Patient, PatientDailyRollup
+from scoring import HIGH_RISK_THRESHOLD
+
+ROLLUP_ID = 1
+
+# Daily rollup key for patients missing a location or age group
+UNKNOWN = "Unknown"
+TIMESERIES_BUCKETS = ["day", "week", "month", "year"]
+TIMESERIES_GROUPS = ["location", "age_group"]
+
+# (dashboard key, patient column, rollup running-sum column)
+SATISFACTION_FIELDS = [
+    ("physical_env", Patient.physical_env_score, DashboardRollup.physical_env_sum),
+    ("technical_quality", Patient.technical_quality_score, DashboardRollup.technical_quality_sum),
+    ("interpersonal", Patient.interpersonal_score, DashboardRollup.interpersonal_sum),
+    ("communication", Patient.communication_score, DashboardRollup.communication_sum),
+    ("accessibility", Patient.accessibility_score, DashboardRollup.accessibility_sum),
+]
+
+
+def _totals_query():
+    # One pass over patients: row count, high-risk count and a sum per satisfaction score
+    return select(
+        func.count(Patient.id),
+        func.coalesce(func.sum(case((Patient.no_show_probability > HIGH_RISK_THRESHOLD, 1), else_=0)), 0),
+        *[func.coalesce(func.sum(column), 0.0) for _, column, _ in SATISFACTION_FIELDS],
+    )
+
+
+def _read_totals(db: Session, use_rollup: bool, feature_store):
+    if use_rollup:
+        rollup = db.get(DashboardRollup, ROLLUP_ID)
+        if rollup is not None:
+            sums = [getattr(rollup, column.key) for _, _, column in SATISFACTION_FIELDS]
+            return rollup.total_patients, rollup.high_risk_patients, sums
+    if feature_store is not None:
+        # Column sums over the in-memory store; only rows added since the last read are queried
+        feature_store.refresh()
+        return feature_store.dashboard_totals()
+    total, high_risk, *sums = db.execute(_totals_query()).one()
+    return total, high_risk, sums
+
+
+def dashboard_stats(db: Session, use_rollup: bool = True, feature_store=None):
+    """Counts and satisfaction averages for the dashboard, or None when there are no patients."""
+    total, high_risk, sums = _read_totals(db, use_rollup, feature_store)
+    if not total:
+        return None
+    return {
+        "total_patients": total,
+        "high_risk_patients": high_risk,
+        "high_risk_percentage": (high_risk / total) * 100,
+        "average_satisfaction_scores": {
+            key: value / total for (key, _, _), value in zip(SATISFACTION_FIELDS, sums)
+        },
+    }
+
+
+def rollup_increment(patients):
+    """UPDATE adding newly inserted patients (column-name dicts) to the rollup row.
+
+    Execute it in the same transaction as the insert so the two never drift.
+    """
+    values = {
+        DashboardRollup.total_patients: DashboardRollup.total_patients + len(patients),
+        DashboardRollup.high_risk_patients: DashboardRollup.high_risk_patients + sum(
+            1 for patient in patients if patient["no_show_probability"] > HIGH_RISK_THRESHOLD
+        ),
+    }
+    for _, score_column, sum_column in SATISFACTION_FIELDS:
+        values[sum_column] = sum_column + sum(patient[score_column.key] for patient in patients)
+    return update(DashboardRollup).where(DashboardRollup.id == ROLLUP_ID).values(values)
+
+
+def daily_rollup_upsert(patients):
+    """(statement, parameter sets) adding newly inserted patients to their daily rollup rows.
+
+    One upsert per (day, location, age group) in the batch, run as a single
+    executemany. Patients without created_at are skipped.
+    """
+    counters = ["total_patients", "high_risk_patients", *[sum_column.key for _, _, sum_column in SATISFACTION_FIELDS]]
+    groups = {}
+    for patient in patients:
+        if not patient.get("created_at"):
+            continue
+        key = (patient["created_at"][:10], patient["location"] or UNKNOWN, patient["age_group"] or UNKNOWN)
+        totals = groups.setdefault(key, [0] * len(counters))
+        totals[0] += 1
+        totals[1] += patient["no_show_probability"] > HIGH_RISK_THRESHOLD
+        for index, (_, score_column, _) in enumerate(SATISFACTION_FIELDS, start=2):
+            totals[index] += patient[score_column.key]
+    statement = sqlite_insert(PatientDailyRollup)
+    statement = statement.on_conflict_do_update(
+        index_elements=["day", "location", "age_group"],
+        set_={name: getattr(PatientDailyRollup, name) + getattr(statement.excluded, name) for name in counters},
+    )
+    parameters = [
+        {"day": day, "location": location, "age_group": age_group, **dict(zip(counters, totals))}
+        for (day, location, age_group), totals in groups.items()
+    ]
+    return statement, parameters
+
+
+def apply_rollups(db: Session, patients):
+    """Add newly inserted patients (column-name dicts) to the dashboard and daily rollups.
+
+    Execute it in the same transaction as the insert so they never drift.
+    """
+    db.execute(rollup_increment(patients))
+    statement, parameters = daily_rollup_upsert(patients)
+    if parameters:
+        db.execute(statement, parameters)
+
+
+def _daily_dimensions(use_rollup):
+    if use_rollup:
+        return PatientDailyRollup.day, PatientDailyRollup.location, PatientDailyRollup.age_group
+    return (
+        func.substr(Patient.created_at, 1, 10),
+        func.coalesce(Patient.location, UNKNOWN),
+        func.coalesce(Patient.age_group, UNKNOWN),
+    )
+
+
+def rebuild_rollups(db: Session):
+    """Recompute the dashboard and daily rollups from the patients table, e.g. after bulk rewrites."""
+    total, high_risk, *sums = db.execute(_totals_query()).one()
+    rollup = db.get(DashboardRollup, ROLLUP_ID) or DashboardRollup(id=ROLLUP_ID)
+    rollup.total_patients = total
+    rollup.high_risk_patients = high_risk
+    for (_, _, sum_column), value in zip(SATISFACTION_FIELDS, sums):
+        setattr(rollup, sum_column.key, value)
+    db.add(rollup)
+
+    dimensions = _daily_dimensions(use_rollup=False)
+    db.execute(delete(PatientDailyRollup))
+    db.execute(insert(PatientDailyRollup).from_select(
+        ["day", "location", "age_group", "total_patients", "high_risk_patients",
+         *[sum_column.key for _, _, sum_column in SATISFACTION_FIELDS]],
+        select(*dimensions, *_totals_query().selected_columns)
+        .where(Patient.created_at.is_not(None)).group_by(*dimensions),
+    ))
+    db.commit()
+
+
+def ensure_rollups(db: Session):
+    # Rebuild if the row is missing or rows were written while the rollups were disabled
+    rollup = db.get(DashboardRollup, ROLLUP_ID)
+    patient_count, dated_count = db.execute(select(func.count(Patient.id), func.count(Patient.created_at))).one()
+    daily_count = db.scalar(select(func.coalesce(func.sum(PatientDailyRollup.total_patients), 0)))
+    if rollup is None or rollup.total_patients != patient_count or daily_count != dated_count:
+        rebuild_rollups(db)
+
+
+def _period(day, bucket):
+    if bucket == "week":
+        # Monday of the day's week
+        return func.date(day, "weekday 0", "-6 days")
+    if bucket == "month":
+        return func.substr(day, 1, 7)
+    if bucket == "year":
+        return func.substr(day, 1, 4)
+    return day
+
+
+def timeseries(db: Session, start, end, bucket="day", group_by=None, locations=None, age_groups=None,
+               use_rollup=True):
+    """Patient counts, high-risk counts and satisfaction averages per period between two dates (inclusive).
+
+    Reads the daily rollup, whose size depends on days x locations x age
+    groups rather than on patients, so multi-year ranges stay cheap. Without
+    rollups it groups the patients table by created_at instead.
+    """
+    day, location, age_group = _daily_dimensions(use_rollup)
+    if use_rollup:
+        measures = [func.sum(PatientDailyRollup.total_patients), func.sum(PatientDailyRollup.high_risk_patients)]
+        measures += [func.sum(getattr(PatientDailyRollup, sum_column.key)) for _, _, sum_column in SATISFACTION_FIELDS]
+        conditions = [day >= start.isoformat(), day <= end.isoformat()]
+    else:
+        measures = list(_totals_query().selected_columns)
+        # A range on the indexed created_at; every timestamp on `end` sorts below the next day
+        conditions = [Patient.created_at >= start.isoformat(),
+                      Patient.created_at < (end + timedelta(days=1)).isoformat()]
+    if locations:
+        conditions.append(location.in_(locations))
+    if age_groups:
+        conditions.append(age_group.in_(age_groups))
+
+    dimensions = [_period(day, bucket)]
+    if group_by is not None:
+        dimensions.append({"location": location, "age_group": age_group}[group_by])
+    rows = db.execute(
+        select(*dimensions, *measures).where(*conditions).group_by(*dimensions).order_by(*dimensions)
+    ).all()
+
+    points = []
+    for row in rows:
+        total, high_risk, *sums = row[len(dimensions):]
+        if not total:
+            continue
+        points.append({
+            "period": row[0],
+            "group": row[1] if group_by is not None else None,
+            "total_patients": total,
+            "high_risk_patients": high_risk,
+            "high_risk_percentage": (high_risk / total) * 100,
+            "average_satisfaction_scores": {
+                key: value / total for (key, _, _), value in zip(SATISFACTION_FIELDS, sums)
+            },
+        })
+    return points
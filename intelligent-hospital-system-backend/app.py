@@ -1,16 +1,123 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
-import numpy as np
-from database import SessionLocal, engine, Patient
-from models import PatientCreate, Patient as PatientModel, PredictionRequest, PredictionResponse
+from database import SessionLocal, engine, init_db, Patient, data_version
+from models import PatientBase, PatientCreate, Patient as PatientModel, PredictionRequest, PredictionResponse, Timeseries, ModelStatus, BulkIngestResult, ScheduleRequest, ScheduleResult, DayLoad, ReminderPlanRequest, ReminderPlanResult, ReminderStatus, SimulationRequest, SimulationResult
+from predictor import NoShowPredictor, RetrainScheduler
+from feature_store import FeatureStore, patient_features
+from model_registry import ModelRegistry
+from analytics import TIMESERIES_BUCKETS, TIMESERIES_GROUPS, apply_rollups, dashboard_stats, ensure_rollups, timeseries
+from scoring import RECOMMENDED_ACTIONS, RISK_FIELDS, no_show_probabilities, no_show_probability, risk_level, risk_levels
+from ingest import MAX_CHUNK_SIZE, insert_chunk, insert_patient_rows, iter_lines, iter_records, new_patient_values
+from group_commit import GroupCommitWriter
+from pagination import patients_page, next_cursor_headers
+from http_cache import ResponseCache
+from search import PatientSearchParams, search_headers, search_patients
+from serialization import ListingParams
+from scheduling import booked_arrivals, day_load, run_schedule
+from reminders import plan_reminders, reminder_status_counts
+from export import MEDIA_TYPES, stream_patients
+from simulation import ClinicSimulator, Scenario
+from metrics import MetricsMiddleware
+import metrics
+import config
 import json
 
+# Every patient's model features and scores as NumPy columns, for training and aggregates
+feature_store = FeatureStore(engine, data_version)
+predictor = NoShowPredictor()
+model_registry = ModelRegistry(config.MODEL_DIR, keep_versions=config.MODEL_KEEP_VERSIONS)
+retrainer = RetrainScheduler(
+    predictor,
+    feature_store,
+    model_registry,
+    min_new_rows=config.RETRAIN_MIN_NEW_ROWS,
+    max_delay=config.RETRAIN_MAX_DELAY_SECONDS,
+    poll_interval=config.MODEL_POLL_SECONDS,
+)
+
+# Clinic-flow Monte Carlo runs; its worker processes start on the first large simulation
+simulator = ClinicSimulator(workers=config.SIMULATION_WORKERS, inline_work=config.SIMULATION_INLINE_WORK)
+
+# ETags and cached bodies for read routes, invalidated by the shared data version
+response_cache = ResponseCache(
+    data_version,
+    max_entries=config.RESPONSE_CACHE_ENTRIES,
+    max_age=config.HTTP_CACHE_MAX_AGE_SECONDS,
+)
+
+# Opt-in: batch concurrent single-patient inserts into shared transactions
+patient_writer = GroupCommitWriter(
+    SessionLocal,
+    lambda db, rows: insert_patient_rows(db, rows, config.USE_DASHBOARD_ROLLUP),
+    window=config.GROUP_COMMIT_WINDOW_MS / 1000,
+    max_batch=config.GROUP_COMMIT_MAX_BATCH,
+) if config.GROUP_COMMIT else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    if config.USE_DASHBOARD_ROLLUP:
+        with SessionLocal() as db:
+            ensure_rollups(db)
+    # One bulk load; later reads only fetch rows added since
+    if config.FAST_STARTUP:
+        # Answer requests straight away; readers that need the store wait for this load
+        threading.Thread(target=feature_store.refresh, name="feature-store-load", daemon=True).start()
+    else:
+        feature_store.refresh()
+    if patient_writer is not None:
+        patient_writer.start()
+    # Serve the last published model straight away; only train if there is none yet
+    if not predictor.load_latest(model_registry):
+        retrainer.request()
+    retrainer.start()
+    # Opt-in: send reminders from this process's event loop (normally python reminders.py)
+    reminder_task = reminder_stop = None
+    if config.REMINDER_DISPATCHER_IN_API:
+        from reminders import create_dispatcher
+        reminder_stop = asyncio.Event()
+        reminder_task = asyncio.create_task(create_dispatcher().run(reminder_stop))
+    yield
+    if reminder_task is not None:
+        reminder_stop.set()
+        await reminder_task
+    retrainer.stop()
+    simulator.stop()
+    if patient_writer is not None:
+        patient_writer.stop()
+    if config.DB_MODE == "async":
+        from async_database import async_engine
+        await async_engine.dispose()
+
+MAX_PREDICTION_BATCH = 10_000
+
+RESEARCH_INSIGHTS = {
+    "overcrowding_issue": "89.9% reported clinic overcrowding",
+    "toilet_cleanliness": "60.7% dissatisfied with toilet cleanliness", 
+    "staff_attitude": "81.9% satisfied with interpersonal relations",
+    "accessibility": "61.4% satisfied with access to care"
+}
+
 app = FastAPI(title="Hospital Management API", 
               description="AI-powered hospital management system based on Kiambu Level 5 Hospital research",
-              version="1.0.0")
+              version="1.0.0",
+              lifespan=lifespan)
+
+app.add_middleware(MetricsMiddleware)
+if config.PROFILING_ENABLED:
+    from profiling import ProfilingMiddleware
+    app.add_middleware(ProfilingMiddleware, directory=config.PROFILE_DIR,
+                       interval=config.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+
+metrics.Gauge("model_retrain_pending_rows", "Inserted rows the served model has not been trained on yet",
+              collect=lambda: {(): retrainer.pending_rows})
 
 # Dependency
 def get_db():
@@ -20,148 +127,249 @@ def get_db():
     finally:
         db.close()
 
-# ML Model (Simplified for demo)
-class NoShowPredictor:
-    def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.encoders = {}
-        self.is_trained = False
-    
-    def train_model(self, db: Session):
-        # Get all patients for training
-        patients = db.query(Patient).all()
-        if len(patients) < 10:
-            return
-            
-        # Prepare data (using your research insights)
-        data = []
-        for patient in patients:
-            # Based on your research: age, education, satisfaction scores affect attendance
-            risk_factors = [
-                1 if patient.age_group == "48+" else 0,  # 48% were 48+ - higher risk
-                1 if patient.gender == "Female" else 0,  # 73% female
-                1 if patient.education == "Primary" else 0,  # Education affects health literacy
-                patient.physical_env_score,  # 61.8% satisfaction
-                patient.accessibility_score,  # 61.4% satisfaction - key factor
-            ]
-            data.append(risk_factors)
-        
-        if len(data) > 0:
-            X = np.array(data)
-            # Synthetic targets based on your research insights
-            y = np.random.randint(0, 2, len(data))
-            self.model.fit(X, y)
-            self.is_trained = True
-
-predictor = NoShowPredictor()
+def on_patients_inserted(count):
+    # Retraining is debounced and runs in a worker process, off the request path
+    retrainer.notify(count)
 
 @app.post("/patients/", response_model=PatientModel)
 def create_patient(patient: PatientCreate, db: Session = Depends(get_db)):
-    # Calculate no-show probability based on your research factors
-    risk_score = 0
+    values = new_patient_values(patient)
+    if patient_writer is not None:
+        patient_id = patient_writer.submit(values).result()
+        on_patients_inserted(1)
+        return {**values, "id": patient_id}
     
-    # Age factor (48+ group represents 48% of respondents)
-    if patient.age_group == "48+":
-        risk_score += 0.3
+    db_patient = Patient(**values)
     
-    # Education factor (48% secondary, 34% primary)
-    if patient.education == "Primary":
-        risk_score += 0.2
+    db.add(db_patient)
+    if config.USE_DASHBOARD_ROLLUP:
+        apply_rollups(db, [values])
+    db.commit()
+    db.refresh(db_patient)
     
-    # Satisfaction factors from your research
-    satisfaction_penalty = (100 - patient.accessibility_score) * 0.01  # 61.4% satisfaction
-    risk_score += satisfaction_penalty
+    on_patients_inserted(1)
     
-    # Gender factor (73% female in your study)
-    if patient.gender == "Female":
-        risk_score -= 0.1  # Slightly lower risk based on higher participation
+    return db_patient
+
+@app.post("/patients/bulk", response_model=BulkIngestResult)
+async def bulk_create_patients(request: Request, format: Optional[str] = None, chunk_size: int = 1000):
+    # Streamed NDJSON (default) or CSV with a header row; format can come from the content type
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    if not 1 <= chunk_size <= MAX_CHUNK_SIZE:
+        raise HTTPException(status_code=400, detail=f"chunk_size must be between 1 and {MAX_CHUNK_SIZE}")
     
-    no_show_prob = min(0.95, max(0.05, risk_score))
+    inserted, errors, chunk = 0, [], []
     
-    db_patient = Patient(
-        **patient.dict(),
-        no_show_probability=no_show_prob,
-        preferred_contact="SMS"  # Default
-    )
+    async def flush():
+        nonlocal inserted
+        count, chunk_errors = await run_in_threadpool(insert_chunk, SessionLocal, chunk, config.USE_DASHBOARD_ROLLUP)
+        inserted += count
+        errors.extend(chunk_errors)
+        chunk.clear()
     
-    db.add(db_patient)
-    db.commit()
-    db.refresh(db_patient)
+    async for record in iter_records(iter_lines(request.stream()), fmt):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            await flush()
+    if chunk:
+        await flush()
     
-    # Retrain model with new data
-    predictor.train_model(db)
+    # One retrain for the whole upload rather than one per row
+    if inserted:
+        on_patients_inserted(inserted)
     
-    return db_patient
+    return BulkIngestResult(inserted=inserted, failed=len(errors), errors=errors)
 
 @app.get("/patients/", response_model=list[PatientModel])
-def read_patients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    patients = db.query(Patient).offset(skip).limit(limit).all()
-    return patients
+def read_patients(request: Request, skip: int = 0, limit: int = 100, cursor: Optional[int] = None,
+                  listing: ListingParams = Depends(), db: Session = Depends(get_db)):
+    # A 304 or cache hit returns before the session ever checks out a connection
+    key, cached = response_cache.lookup(request)
+    if cached is not None:
+        return cached
+    # Only the requested columns, encoded straight from the row tuples (no ORM objects or model validation)
+    patients = patients_page(db, listing.columns("id"), skip, limit, cursor)
+    return response_cache.store(key, listing.encode(patients), next_cursor_headers(request, patients, limit),
+                                listing.media_type)
+
+@app.get("/patients/search", response_model=list[PatientModel])
+def search_patients_route(request: Request, params: PatientSearchParams = Depends(),
+                          listing: ListingParams = Depends(), db: Session = Depends(get_db)):
+    # e.g. /patients/search?age_group=48%2B&location=Limuru&min_probability=0.7&count=true&fields=id,location
+    key, cached = response_cache.lookup(request)
+    if cached is not None:
+        return cached
+    patients, total = search_patients(db, params, listing.columns("id", params.sort))
+    return response_cache.store(key, listing.encode(patients), search_headers(request, params, patients, total),
+                                listing.media_type)
+
+@app.get("/patients/export")
+def export_patients(format: str = "ndjson"):
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    # The generator opens its own session, so it outlives this handler while streaming
+    return StreamingResponse(
+        stream_patients(SessionLocal, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="patients.{format}"'},
+    )
 
 @app.post("/predict-no-show/", response_model=PredictionResponse)
 def predict_no_show(request: PredictionRequest):
-    patient = request.patient_data
-    
-    # Calculate probability based on your research insights
-    base_risk = 0.3  # Base risk from your findings
-    
-    # Add risk factors from your demographic analysis
-    if patient.age_group == "48+":
-        base_risk += 0.15
-    if patient.education == "Primary":
-        base_risk += 0.10
-    if patient.accessibility_score < 70:  # Below average from your 61.4% finding
-        base_risk += 0.20
-    
-    probability = min(0.95, base_risk)
+    """Score one patient with the served forest, or the risk rules until a model is published.
+
+    The forest is fit on placeholder random labels (see predictor.fit_model), so
+    its answer generally differs from the rule-based no_show_probability stored
+    on each patient, which scheduling, reminders and the dashboard use. The
+    response's model_version says which scorer answered.
+    """
+    snapshot = predictor.snapshot
+    if snapshot.compiled is not None:
+        # The trained forest, through its compiled inference path
+        probability = snapshot.compiled.predict_one(patient_features(request.patient_data))
+    else:
+        # Rule-based score until the first model is published
+        probability = no_show_probability(request.patient_data)
     
     # Determine risk level
-    if probability > 0.7:
-        risk_level = "High"
-        actions = ["Send SMS reminder 3 days before", "Follow-up call 1 day before", "Consider rescheduling"]
-    elif probability > 0.4:
-        risk_level = "Medium" 
-        actions = ["Send SMS reminder 2 days before", "Confirm attendance 1 day before"]
-    else:
-        risk_level = "Low"
-        actions = ["Standard SMS reminder 1 day before"]
+    level = risk_level(probability)
     
     return PredictionResponse(
         no_show_probability=probability,
-        risk_level=risk_level,
-        recommended_actions=actions
+        risk_level=level,
+        recommended_actions=RECOMMENDED_ACTIONS[level],
+        model_version=snapshot.version if snapshot.compiled is not None else None
     )
 
-@app.get("/analytics/dashboard")
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    patients = db.query(Patient).all()
-    
+@app.post("/predict-no-show/batch", response_model=list[PredictionResponse])
+def predict_no_show_batch(patients: list[PatientBase]):
+    if len(patients) > MAX_PREDICTION_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PREDICTION_BATCH} patients per batch")
     if not patients:
-        return {"message": "No data available"}
+        return []
     
-    # Analytics based on your research
-    total_patients = len(patients)
-    high_risk = len([p for p in patients if p.no_show_probability > 0.7])
-    avg_satisfaction = {
-        "physical_env": np.mean([p.physical_env_score for p in patients]),
-        "technical_quality": np.mean([p.technical_quality_score for p in patients]),
-        "interpersonal": np.mean([p.interpersonal_score for p in patients]),
-        "communication": np.mean([p.communication_score for p in patients]),
-        "accessibility": np.mean([p.accessibility_score for p in patients])
-    }
+    # One vectorized pass over the whole batch; results keep the request order
+    snapshot = predictor.snapshot
+    if snapshot.compiled is not None:
+        probabilities = snapshot.compiled.predict([patient_features(patient) for patient in patients])
+        model_version = snapshot.version
+    else:
+        probabilities = no_show_probabilities(
+            {field: [getattr(patient, field) for patient in patients] for field in RISK_FIELDS}
+        )
+        model_version = None
+    return [
+        PredictionResponse(no_show_probability=probability, risk_level=level,
+                           recommended_actions=RECOMMENDED_ACTIONS[level], model_version=model_version)
+        for probability, level in zip(probabilities.tolist(), risk_levels(probabilities).tolist())
+    ]
+
+@app.get("/analytics/dashboard")
+def get_dashboard_stats(request: Request, db: Session = Depends(get_db)):
+    key, cached = response_cache.lookup(request)
+    if cached is not None:
+        return cached
     
-    return {
-        "total_patients": total_patients,
-        "high_risk_patients": high_risk,
-        "high_risk_percentage": (high_risk / total_patients) * 100,
-        "average_satisfaction_scores": avg_satisfaction,
-        "research_based_insights": {
-            "overcrowding_issue": "89.9% reported clinic overcrowding",
-            "toilet_cleanliness": "60.7% dissatisfied with toilet cleanliness", 
-            "staff_attitude": "81.9% satisfied with interpersonal relations",
-            "accessibility": "61.4% satisfied with access to care"
+    # Read from the rollup row, or summed over the feature store's columns; never row by row in Python
+    stats = dashboard_stats(db, use_rollup=config.USE_DASHBOARD_ROLLUP, feature_store=feature_store)
+    
+    if stats is None:
+        payload = {"message": "No data available"}
+    else:
+        # Analytics based on your research
+        payload = {
+            **stats,
+            "research_based_insights": RESEARCH_INSIGHTS
         }
-    }
+    return response_cache.store(key, json.dumps(payload).encode())
+
+@app.get("/analytics/timeseries", response_model=Timeseries)
+def get_timeseries(request: Request, start: date, end: date, bucket: str = "day", group_by: Optional[str] = None,
+                   location: Optional[list[str]] = Query(None), age_group: Optional[list[str]] = Query(None),
+                   db: Session = Depends(get_db)):
+    # e.g. /analytics/timeseries?start=2024-01-01&end=2024-12-31&bucket=month&group_by=location
+    if bucket not in TIMESERIES_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(TIMESERIES_BUCKETS)}")
+    if group_by is not None and group_by not in TIMESERIES_GROUPS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(TIMESERIES_GROUPS)}")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    key, cached = response_cache.lookup(request)
+    if cached is not None:
+        return cached
+    # Summed from the per-day rollup, so the cost follows the number of days, not patients
+    points = timeseries(db, start, end, bucket, group_by, location, age_group, use_rollup=config.USE_DASHBOARD_ROLLUP)
+    series = Timeseries(bucket=bucket, group_by=group_by, start=start, end=end, points=points)
+    return response_cache.store(key, series.model_dump_json().encode())
+
+@app.post("/schedule/run", response_model=ScheduleResult)
+def schedule_patients(request: ScheduleRequest, db: Session = Depends(get_db)):
+    # Books everyone without an upcoming appointment, overbooking slots by expected attendance
+    return run_schedule(db, request)
+
+@app.get("/schedule/load", response_model=DayLoad)
+def get_schedule_load(request: Request, day: date, clinic: Optional[str] = None, db: Session = Depends(get_db)):
+    key, cached = response_cache.lookup(request)
+    if cached is not None:
+        return cached
+    load = DayLoad(**day_load(db, day, clinic))
+    return response_cache.store(key, load.model_dump_json().encode())
+
+@app.post("/simulate", response_model=SimulationResult)
+def simulate_clinic(request: SimulationRequest, db: Session = Depends(get_db)):
+    # Compare staffing and reminder scenarios on the same simulated clinic days
+    if request.appointments is not None:
+        scheduled = [appointment.arrival_minute for appointment in request.appointments]
+        probabilities = [appointment.no_show_probability for appointment in request.appointments]
+        booked_clinicians = 3
+    elif request.day is not None and request.clinic is not None:
+        scheduled, probabilities, booked_clinicians = booked_arrivals(db, request.day, request.clinic)
+    else:
+        raise HTTPException(status_code=400, detail="Give either appointments, or a day and clinic")
+    if not scheduled:
+        raise HTTPException(status_code=404, detail="No appointments to simulate")
+
+    baseline = Scenario("baseline", request.clinicians or booked_clinicians, 0.0, request.service_minutes_mean)
+    scenarios = [
+        Scenario(scenario.name, scenario.clinicians or baseline.clinicians, scenario.no_show_reduction,
+                 scenario.service_minutes_mean or baseline.service_minutes_mean)
+        for scenario in request.scenarios
+    ] or [baseline]
+    session_minutes = request.session_minutes or max(scheduled) + request.service_minutes_mean
+    results = simulator.run(scheduled, probabilities, scenarios, request.replications, request.seed,
+                            request.arrival_sd_minutes, request.service_minutes_cv, session_minutes)
+    return SimulationResult(appointments=len(scheduled), replications=request.replications,
+                            session_minutes=session_minutes, scenarios=results)
+
+@app.post("/reminders/plan", response_model=ReminderPlanResult)
+def plan_appointment_reminders(request: ReminderPlanRequest, db: Session = Depends(get_db)):
+    # Turns each appointment's risk level into reminder jobs; reruns skip jobs that already exist
+    created, already_planned = plan_reminders(db, request.start_date, request.days)
+    return ReminderPlanResult(created=created, already_planned=already_planned)
+
+@app.get("/reminders/status", response_model=ReminderStatus)
+def get_reminder_status(db: Session = Depends(get_db)):
+    return reminder_status_counts(db)
+
+@app.get("/model/status", response_model=ModelStatus)
+def get_model_status():
+    snapshot = predictor.snapshot
+    return ModelStatus(
+        is_trained=snapshot.compiled is not None,
+        version=snapshot.version,
+        trained_at=snapshot.trained_at,
+        training_rows=snapshot.training_rows,
+        pending_rows=retrainer.pending_rows,
+        training_in_progress=retrainer.training,
+        last_error=retrainer.last_error,
+    )
+
+@app.get("/metrics")
+def get_metrics():
+    # Prometheus text format; each worker process reports its own numbers
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/")
 def read_root():
@@ -170,12 +378,38 @@ def read_root():
         "description": "Based on Kiambu Level 5 Hospital Research - Low Clinical Attendance Analysis",
         "endpoints": {
             "POST /patients/": "Create new patient record",
+            "POST /patients/bulk": "Import patients from a streamed NDJSON or CSV body",
             "GET /patients/": "Get all patients", 
+            "GET /patients/search": "Filter, sort and count patients, with cursor paging",
+            "GET /patients/export": "Stream every patient as NDJSON or CSV",
             "POST /predict-no-show/": "Predict no-show probability",
-            "GET /analytics/dashboard": "Get research insights and analytics"
+            "POST /predict-no-show/batch": "Predict no-show probability for a list of patients",
+            "GET /analytics/dashboard": "Get research insights and analytics",
+            "GET /analytics/timeseries": "Patient counts, high-risk share and satisfaction per day, week, month or year",
+            "POST /schedule/run": "Book patients into clinic slots, overbooking by no-show risk",
+            "GET /schedule/load": "Appointments and expected attendance per clinician for a day",
+            "POST /simulate": "Monte Carlo waiting times and queue lengths of a clinic day under staffing scenarios",
+            "POST /reminders/plan": "Create reminder jobs for upcoming appointments from their risk level",
+            "GET /reminders/status": "Count reminder jobs by status",
+            "GET /model/status": "Get the version and training details of the served model",
+            "GET /metrics": "Prometheus metrics for this worker process"
         }
     }
 
+def use_async_routes():
+    # Replace the sync database routes with their async counterparts, keeping everything else
+    from async_routes import create_router
+    router = create_router(on_patients_inserted, RESEARCH_INSIGHTS, response_cache, feature_store, patient_writer)
+    replaced = {(route.path, frozenset(route.methods)) for route in router.routes}
+    app.router.routes = [
+        route for route in app.router.routes
+        if (getattr(route, "path", None), frozenset(getattr(route, "methods", None) or ())) not in replaced
+    ]
+    app.include_router(router)
+
+if config.DB_MODE == "async":
+    use_async_routes()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,21 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from database import SQLALCHEMY_DATABASE_URL, configure_sqlite, engine_options
+from metrics import TimedAsyncAdaptedQueuePool, instrument_engine
+
+# Same database file as the sync engine, through the aiosqlite driver
+ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+options = engine_options(ASYNC_DATABASE_URL)
+if options:
+    # aiosqlite defaults to NullPool, which would open a connection per request
+    options["poolclass"] = TimedAsyncAdaptedQueuePool
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **options)
+configure_sqlite(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine, "async")
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+# Dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,73 @@
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Request
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config
+from analytics import apply_rollups, dashboard_stats
+from async_database import get_async_db
+from database import Patient
+from ingest import new_patient_values
+from models import Patient as PatientModel, PatientCreate
+from pagination import next_cursor_headers, patients_page
+from serialization import ListingParams
+
+
+def create_router(on_patients_inserted, research_insights, response_cache, feature_store, patient_writer=None):
+    """async def versions of the database-bound routes, for DB_MODE=async.
+
+    Query code is shared with the sync routes through AsyncSession.run_sync,
+    which runs it on the event loop while aiosqlite does the I/O.
+    """
+    router = APIRouter()
+
+    @router.post("/patients/", response_model=PatientModel)
+    async def create_patient(patient: PatientCreate, db: AsyncSession = Depends(get_async_db)):
+        values = new_patient_values(patient)
+        if patient_writer is not None:
+            patient_id = await asyncio.wrap_future(patient_writer.submit(values))
+            on_patients_inserted(1)
+            return {**values, "id": patient_id}
+
+        db_patient = Patient(**values)
+
+        db.add(db_patient)
+        if config.USE_DASHBOARD_ROLLUP:
+            await db.run_sync(apply_rollups, [values])
+        await db.commit()
+
+        on_patients_inserted(1)
+
+        return db_patient
+
+    @router.get("/patients/", response_model=list[PatientModel])
+    async def read_patients(request: Request, skip: int = 0, limit: int = 100, cursor: Optional[int] = None,
+                            listing: ListingParams = Depends(), db: AsyncSession = Depends(get_async_db)):
+        key, cached = response_cache.lookup(request)
+        if cached is not None:
+            return cached
+        patients = await db.run_sync(patients_page, listing.columns("id"), skip, limit, cursor)
+        return response_cache.store(key, listing.encode(patients), next_cursor_headers(request, patients, limit),
+                                    listing.media_type)
+
+    @router.get("/analytics/dashboard")
+    async def get_dashboard_stats(request: Request, db: AsyncSession = Depends(get_async_db)):
+        key, cached = response_cache.lookup(request)
+        if cached is not None:
+            return cached
+
+        if not config.USE_DASHBOARD_ROLLUP:
+            # Catch the feature store up off the event loop; dashboard_stats then only reads memory
+            await run_in_threadpool(feature_store.refresh)
+        stats = await db.run_sync(dashboard_stats, config.USE_DASHBOARD_ROLLUP, feature_store)
+
+        if stats is None:
+            payload = {"message": "No data available"}
+        else:
+            payload = {**stats, "research_based_insights": research_insights}
+        return response_cache.store(key, json.dumps(payload).encode())
+
+    return router
@@ -0,0 +1,45 @@
+"""Compare the sync and async database modes under concurrent load.
+
+Starts the API with uvicorn once per DB_MODE on a throwaway database, seeds it
+through /patients/bulk, then drives a read-heavy mix of requests from N
+concurrent clients and prints requests/second and latency percentiles as JSON.
+
+    python benchmarks/async_vs_sync.py --concurrency 50 100 200 --duration 10
+"""
+import argparse
+import asyncio
+import json
+
+from harness import local_server, random_patient, run_load, seed
+
+REQUEST_MIX = [
+    ("list", 0.5, lambda rng: ("GET", "/patients/?limit=50", None)),
+    ("dashboard", 0.3, lambda rng: ("GET", "/analytics/dashboard", None)),
+    ("create", 0.2, lambda rng: ("POST", "/patients/", random_patient(rng))),
+]
+
+
+async def benchmark_mode(mode, args):
+    async with local_server(env={"DB_MODE": mode}) as base_url:
+        await seed(base_url, args.seed_rows)
+        results = []
+        for concurrency in args.concurrency:
+            overall = (await run_load(base_url, REQUEST_MIX, concurrency, args.duration))["all"]
+            results.append({"concurrency": concurrency, **overall})
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[50, 100, 200])
+    parser.add_argument("--duration", type=float, default=10, help="seconds per concurrency level")
+    parser.add_argument("--seed-rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    results = {mode: asyncio.run(benchmark_mode(mode, args)) for mode in args.modes}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
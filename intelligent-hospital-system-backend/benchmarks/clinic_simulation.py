@@ -0,0 +1,56 @@
+"""Clinic-flow simulation throughput: replications per second in-process vs over the process pool.
+
+Simulates a full clinic day (16 half-hour slots, 3 clinicians, two
+bookings per slot) under a baseline, an extra clinician and halved
+no-shows, and prints timings as JSON. Results are identical for every
+worker count.
+
+    python benchmarks/clinic_simulation.py --replications 20000 --workers 1 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--replications", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    from simulation import ClinicSimulator, Scenario
+
+    scheduled = [30.0 * (booking // 6) for booking in range(96)]
+    probabilities = [0.3] * len(scheduled)
+    scenarios = [
+        Scenario("baseline", 3, 0.0, 25.0),
+        Scenario("extra clinician", 4, 0.0, 25.0),
+        Scenario("more reminders", 3, 0.5, 25.0),
+    ]
+    results = {"replications": args.replications, "appointments": len(scheduled), "runs": []}
+    for workers in args.workers:
+        simulator = ClinicSimulator(workers=workers, inline_work=0)
+        try:
+            started = time.perf_counter()
+            summary = simulator.run(scheduled, probabilities, scenarios, args.replications, 42, 10.0, 0.5, 480.0)
+            elapsed = time.perf_counter() - started
+        finally:
+            simulator.stop()
+        results["runs"].append({
+            "workers": workers,
+            # Includes starting the worker processes
+            "seconds": round(elapsed, 3),
+            "replications_per_second": round(args.replications * len(scenarios) / elapsed),
+            "p90_waiting_minutes": {scenario["name"]: round(scenario["waiting_minutes"]["p90"], 2)
+                                    for scenario in summary},
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Served-model latency: sklearn predict_proba vs the compiled forest, single rows and batches.
+
+Fits the production forest (100 trees) on synthetic patients and prints
+microseconds per call as JSON. "grid" is the threshold-grid lookup used
+when the trees split on few distinct thresholds (integer scores in the
+synthetic 55-70 range); "integer_grid" the lookup over integer inputs used
+for the full 0-100 score range of the form sliders; "walk" the node-array
+traversal used for arbitrary continuous features.
+
+    python benchmarks/forest_inference.py --rows 20000 --batch 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def synthetic_features(rng, rows, integer_scores, low=55, high=70):
+    # FEATURE_SCHEMA: age_48_plus, female, primary_education, physical_env_score, accessibility_score
+    flags = (rng.random((rows, 3)) < [0.48, 0.73, 0.34]).astype(float)
+    if integer_scores:
+        scores = rng.integers(low, high + 1, (rows, 2)).astype(float)
+    else:
+        scores = rng.uniform(low, high, (rows, 2))
+    return np.hstack([flags, scores])
+
+
+def per_call_us(call, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1e6, 1)
+
+
+def compare(model, compiled, X, batch, repeat):
+    row = X[0].tolist()
+    batch_rows = X[:batch]
+    expected = model.predict_proba(batch_rows)[:, 1]
+    if compiled.grid is not None:
+        path = "grid"
+    elif compiled.integer_grid is not None and all(value.is_integer() for value in row):
+        path = "integer_grid"
+    else:
+        path = "walk"
+    return {
+        "path": path,
+        "max_abs_difference": float(np.abs(compiled.predict(batch_rows) - expected).max()),
+        "single_predict_proba_us": per_call_us(lambda: model.predict_proba([row]), max(5, repeat // 20)),
+        "single_compiled_us": per_call_us(lambda: compiled.predict_one(row), repeat),
+        f"batch_{batch}_predict_proba_us": per_call_us(lambda: model.predict_proba(batch_rows), 5),
+        f"batch_{batch}_compiled_us": per_call_us(lambda: compiled.predict(batch_rows), 5),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000, help="training rows")
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=2000, help="timed single-row calls")
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    from forest import CompiledForest
+
+    rng = np.random.default_rng(42)
+    results = {"training_rows": args.rows}
+    cases = (
+        ("integer_scores", True, 55, 70),
+        ("integer_scores_0_100", True, 0, 100),
+        ("continuous_scores", False, 55, 70),
+    )
+    for label, integer_scores, low, high in cases:
+        X = synthetic_features(rng, args.rows, integer_scores, low, high)
+        # Same estimator and synthetic targets as predictor.fit_model
+        model = RandomForestClassifier(n_estimators=100, random_state=42).fit(X, rng.integers(0, 2, len(X)))
+        started = time.perf_counter()
+        compiled = CompiledForest(model)
+        results[label] = {
+            "compile_ms": round((time.perf_counter() - started) * 1000, 1),
+            **compare(model, compiled, X, args.batch, args.repeat),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Shared pieces for the HTTP benchmarks: a throwaway server, seeding and a load driver."""
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Research-weighted demographics, as in intelligent-hospital-system-data/synthetic_data.py
+AGE_GROUPS = (["18-27", "28-37", "38-47", "48+"], [0.09, 0.16, 0.26, 0.48])
+GENDERS = (["Male", "Female"], [0.27, 0.73])
+EDUCATION_LEVELS = (["Primary", "Secondary", "University"], [0.34, 0.48, 0.09])
+LOCATIONS = ["Kiambu Town", "Limuru", "Kirigiti", "Thendigua", "Githiga", "Runda", "Other"]
+INCOME_LEVELS = ["<11,000", "11,000-20,999", "21,000-30,999"]
+
+
+def random_patient(rng=random):
+    return {
+        "age_group": rng.choices(*AGE_GROUPS)[0],
+        "gender": rng.choices(*GENDERS)[0],
+        "education": rng.choices(*EDUCATION_LEVELS)[0],
+        "income_level": rng.choice(INCOME_LEVELS),
+        "location": rng.choice(LOCATIONS),
+        "physical_env_score": rng.randint(55, 70),
+        "technical_quality_score": rng.randint(60, 75),
+        "interpersonal_score": rng.randint(75, 90),
+        "communication_score": rng.randint(55, 70),
+        "accessibility_score": rng.randint(55, 70),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+@asynccontextmanager
+async def local_server(env=None, workers=1):
+    """Run the API under uvicorn on a fresh database in a temp dir; yields its base URL."""
+    with tempfile.TemporaryDirectory() as workdir:
+        port = free_port()
+        server_env = dict(
+            os.environ,
+            # Keep background retraining out of the measurements unless asked for
+            RETRAIN_MIN_NEW_ROWS="1000000000",
+            RETRAIN_MAX_DELAY_SECONDS="86400",
+            **(env or {}),
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--app-dir", BACKEND_DIR,
+             "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+            cwd=workdir, env=server_env,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            await wait_until_up(base_url)
+            yield base_url
+        finally:
+            server.terminate()
+            server.wait()
+
+
+async def seed(base_url, rows, seed_value=0, chunk_rows=50_000):
+    """Load `rows` random patients through /patients/bulk."""
+    rng = random.Random(seed_value)
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+        for start in range(0, rows, chunk_rows):
+            count = min(chunk_rows, rows - start)
+            body = "".join(json.dumps(random_patient(rng)) + "\n" for _ in range(count))
+            response = await client.post("/patients/bulk", content=body.encode(),
+                                         headers={"Content-Type": "application/x-ndjson"})
+            response.raise_for_status()
+
+
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)), 2) if len(values) else None
+
+
+def summarize(latencies, errors, elapsed):
+    """Per-endpoint and overall throughput and latency percentiles (ms)."""
+    report = {}
+    for name in sorted(latencies):
+        values = np.array(latencies[name]) * 1000
+        report[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "requests_per_second": round(len(values) / elapsed, 1),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "p99_ms": _percentile(values, 99),
+        }
+    everything = np.concatenate([np.array(values) for values in latencies.values()]) * 1000 if latencies else []
+    report["all"] = {
+        "requests": len(everything),
+        "errors": sum(errors.values()),
+        "requests_per_second": round(len(everything) / elapsed, 1),
+        "p50_ms": _percentile(everything, 50),
+        "p95_ms": _percentile(everything, 95),
+        "p99_ms": _percentile(everything, 99),
+    }
+    return report
+
+
+async def run_load(base_url, mix, concurrency, duration, seed_value=0):
+    """Drive weighted requests from `concurrency` clients for `duration` seconds.
+
+    mix is a list of (name, weight, make_request) where make_request(rng)
+    returns (method, path, json_body).
+    """
+    names = [name for name, _, _ in mix]
+    weights = [weight for _, weight, _ in mix]
+    builders = {name: make_request for name, _, make_request in mix}
+    latencies, errors = defaultdict(list), defaultdict(int)
+    deadline = time.monotonic() + duration
+
+    async def client_loop(client, rng):
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights=weights)[0]
+            method, path, body = builders[name](rng)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                if response.status_code >= 400:
+                    errors[name] += 1
+            except httpx.HTTPError:
+                errors[name] += 1
+            latencies[name].append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.monotonic()
+        await asyncio.gather(*(
+            client_loop(client, random.Random(seed_value * 100_003 + index)) for index in range(concurrency)
+        ))
+        elapsed = time.monotonic() - started
+    return summarize(latencies, errors, elapsed)
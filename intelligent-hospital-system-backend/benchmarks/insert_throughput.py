@@ -0,0 +1,93 @@
+"""Sustained single-patient insert throughput: one commit per insert vs group commit.
+
+Runs N writer threads against a throwaway database file, each inserting
+patients one at a time, and prints rows/second for both strategies as JSON.
+
+    python benchmarks/insert_throughput.py --threads 32 --rows-per-thread 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_PATIENT = {
+    "age_group": "48+",
+    "gender": "Female",
+    "education": "Primary",
+    "income_level": "<11,000",
+    "location": "Limuru",
+    "physical_env_score": 62,
+    "technical_quality_score": 65,
+    "interpersonal_score": 82,
+    "communication_score": 62,
+    "accessibility_score": 61,
+    "no_show_probability": 0.75,
+    "preferred_contact": "SMS",
+}
+
+
+def run_threads(threads, rows_per_thread, insert_one):
+    def worker():
+        for _ in range(rows_per_thread):
+            insert_one()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return round(threads * rows_per_thread / (time.perf_counter() - started), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--rows-per-thread", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    sys.path.insert(0, BACKEND_DIR)
+    from database import SessionLocal, init_db
+    from analytics import rebuild_rollups
+    from group_commit import GroupCommitWriter
+    from ingest import insert_patient_rows
+    import config
+
+    init_db()
+    with SessionLocal() as db:
+        rebuild_rollups(db)
+
+    def commit_per_row():
+        with SessionLocal() as db:
+            insert_patient_rows(db, [dict(SAMPLE_PATIENT)], use_rollup=True)
+            db.commit()
+
+    writer = GroupCommitWriter(
+        SessionLocal,
+        lambda db, rows: insert_patient_rows(db, rows, use_rollup=True),
+        window=config.GROUP_COMMIT_WINDOW_MS / 1000,
+        max_batch=config.GROUP_COMMIT_MAX_BATCH,
+    )
+    writer.start()
+    try:
+        results = {
+            "threads": args.threads,
+            "commit_per_row_rows_per_second": run_threads(args.threads, args.rows_per_thread, commit_per_row),
+            "group_commit_rows_per_second": run_threads(
+                args.threads, args.rows_per_thread, lambda: writer.submit(dict(SAMPLE_PATIENT)).result()
+            ),
+        }
+    finally:
+        writer.stop()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
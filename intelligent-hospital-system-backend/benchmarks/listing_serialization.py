@@ -0,0 +1,77 @@
+"""Patient listing cost: ORM objects + pydantic vs row tuples + the fast encoder, per format and projection.
+
+Seeds a throwaway database, then times building one GET /patients/ body
+of --limit rows both ways, in process, and prints milliseconds and body
+sizes as JSON.
+
+    python benchmarks/listing_serialization.py --rows 50000 --limit 5000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "intelligent-hospital-system-data")
+
+
+def timed_ms(build, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = build()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 2), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000, help="patients in the seeded database")
+    parser.add_argument("--limit", type=int, default=5000, help="rows per listing")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'hospital.db')}"
+        subprocess.run([sys.executable, os.path.join(DATA_DIR, "synthetic_data.py"), "--mode", "bulk",
+                        "--rows", str(args.rows)], cwd=workdir, check=True, stdout=subprocess.DEVNULL)
+
+        sys.path.insert(0, BACKEND_DIR)
+        from pydantic import TypeAdapter
+
+        from database import Patient, SessionLocal
+        from models import Patient as PatientModel
+        from pagination import patients_page
+        import serialization
+        from serialization import ListingParams
+
+        patient_list = TypeAdapter(list[PatientModel])
+        results = {"rows": args.rows, "limit": args.limit, "orjson": serialization.orjson is not None}
+        with SessionLocal() as db:
+            def orm_pydantic():
+                patients = db.query(Patient).order_by(Patient.id).limit(args.limit).all()
+                return patient_list.dump_json(patient_list.validate_python(patients, from_attributes=True))
+
+            def tuples(listing):
+                return lambda: listing.encode(patients_page(db, listing.columns("id"), 0, args.limit))
+
+            variants = {
+                "orm_pydantic": orm_pydantic,
+                "tuples_json": tuples(ListingParams()),
+                "tuples_columnar": tuples(ListingParams(format="columnar")),
+                "tuples_json_3_fields": tuples(ListingParams(fields="id,age_group,no_show_probability")),
+            }
+            if serialization.pa is not None:
+                variants["tuples_arrow"] = tuples(ListingParams(format="arrow"))
+            for name, build in variants.items():
+                milliseconds, size = timed_ms(build, args.repeat)
+                results[name] = {"ms": milliseconds, "bytes": size}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
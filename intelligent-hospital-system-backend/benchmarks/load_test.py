@@ -0,0 +1,116 @@
+"""Concurrent load test for the API, reported as JSON per endpoint.
+
+For each dataset size, starts the backend under uvicorn on a fresh database
+(or targets --url), seeds it, replays a weighted mix of requests from many
+async clients, and reports throughput and p50/p95/p99 latency per endpoint.
+With --baseline, exits non-zero if any endpoint's p95 regressed by more than
+--max-regression.
+
+    python benchmarks/load_test.py --seed-sizes 1000 100000 --concurrency 64 \\
+        --mix create=1,list=4,predict=3,dashboard=2 --output report.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from harness import local_server, random_patient, run_load, seed
+
+ENDPOINTS = {
+    "create": lambda rng: ("POST", "/patients/", random_patient(rng)),
+    "list": lambda rng: ("GET", "/patients/?limit=100", None),
+    "predict": lambda rng: ("POST", "/predict-no-show/", {"patient_data": random_patient(rng)}),
+    "dashboard": lambda rng: ("GET", "/analytics/dashboard", None),
+}
+
+
+def parse_mix(text):
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        mix.append((name, float(weight or 1), ENDPOINTS[name]))
+    return mix
+
+
+def parse_env(pairs):
+    env = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        env[key] = value
+    return env
+
+
+async def run_dataset(size, args):
+    async def measure(base_url):
+        if size:
+            await seed(base_url, size, seed_value=args.seed)
+        return await run_load(base_url, args.mix, args.concurrency, args.duration, seed_value=args.seed)
+
+    if args.url:
+        return await measure(args.url)
+    async with local_server(env=parse_env(args.env), workers=args.workers) as base_url:
+        return await measure(base_url)
+
+
+def find_regressions(report, baseline, max_regression):
+    regressions = []
+    for dataset, endpoints in report["datasets"].items():
+        for endpoint, stats in endpoints.items():
+            previous = baseline.get("datasets", {}).get(dataset, {}).get(endpoint)
+            if not previous or not previous.get("p95_ms") or stats["p95_ms"] is None:
+                continue
+            change = stats["p95_ms"] / previous["p95_ms"] - 1
+            if change > max_regression:
+                regressions.append(f"{dataset} rows / {endpoint}: p95 {previous['p95_ms']}ms -> "
+                                   f"{stats['p95_ms']}ms (+{change:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("create=1,list=4,predict=3,dashboard=2"),
+                        help="endpoint=weight pairs from: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--seed-sizes", nargs="+", type=int, default=[1000],
+                        help="patients loaded before each run; each size gets a fresh database")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15, help="seconds of load per dataset size")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--env", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="extra server settings, e.g. DB_MODE=async GROUP_COMMIT=1")
+    parser.add_argument("--url", help="benchmark an already running server instead of starting one")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for data and request mix")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="previous JSON report to compare p95 latencies against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed p95 slowdown versus --baseline, as a fraction")
+    args = parser.parse_args()
+
+    report = {
+        "config": {
+            "mix": {name: weight for name, weight, _ in args.mix},
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "workers": args.workers,
+            "env": parse_env(args.env),
+        },
+        "datasets": {str(size): asyncio.run(run_dataset(size, args)) for size in args.seed_sizes},
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
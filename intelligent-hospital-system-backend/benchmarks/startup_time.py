@@ -0,0 +1,102 @@
+"""Cold start: time from launching uvicorn to the first answered request.
+
+Seeds a throwaway database, publishes a model as the Render build step does
+(python predictor.py), then starts the API repeatedly and records how long
+until GET / and POST /predict-no-show/ first succeed. Prints the timings as
+JSON and exits non-zero if the median time to first response exceeds the
+budget.
+
+    python benchmarks/startup_time.py --rows 100000 --runs 5 --budget-seconds 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from harness import BACKEND_DIR, free_port, random_patient
+
+DATA_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "intelligent-hospital-system-data")
+
+
+def wait_for(client, method, path, body, deadline):
+    while time.monotonic() < deadline:
+        try:
+            if client.request(method, path, json=body).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"{method} {path} did not succeed before the deadline")
+
+
+def cold_start(env, workdir, timeout):
+    port = free_port()
+    started = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            deadline = started + timeout
+            wait_for(client, "GET", "/", None, deadline)
+            first_response = time.monotonic() - started
+            wait_for(client, "POST", "/predict-no-show/", {"patient_data": random_patient()}, deadline)
+            first_prediction = time.monotonic() - started
+            model_version = client.get("/model/status").json()["version"]
+    finally:
+        server.terminate()
+        server.wait()
+    return first_response, first_prediction, model_version
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="patients in the seeded database")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-seconds", type=float, default=3.0,
+                        help="allowed median time to the first response")
+    parser.add_argument("--env", nargs="*", default=["FAST_STARTUP=1"], metavar="KEY=VALUE",
+                        help="server environment overrides")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'hospital.db')}",
+            MODEL_DIR=os.path.join(workdir, "model_artifacts"),
+            **dict(item.split("=", 1) for item in args.env),
+        )
+        if args.rows:
+            subprocess.run([sys.executable, os.path.join(DATA_DIR, "synthetic_data.py"), "--mode", "bulk",
+                            "--rows", str(args.rows)], env=env, cwd=workdir, check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "predictor.py")],
+                       env=env, cwd=workdir, check=True, stdout=subprocess.DEVNULL)
+
+        runs = [cold_start(env, workdir, timeout=120) for _ in range(args.runs)]
+
+    first_response = statistics.median(run[0] for run in runs)
+    report = {
+        "rows": args.rows,
+        "env": args.env,
+        "first_response_seconds": [round(run[0], 3) for run in runs],
+        "first_prediction_seconds": [round(run[1], 3) for run in runs],
+        "model_versions": [run[2] for run in runs],
+        "median_first_response_seconds": round(first_response, 3),
+        "budget_seconds": args.budget_seconds,
+    }
+    print(json.dumps(report, indent=2))
+    if first_response > args.budget_seconds:
+        print(f"OVER BUDGET: median first response {first_response:.2f}s > {args.budget_seconds}s", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import os
+
+# Background model retraining: retrain after this many new rows or after this
+# many seconds since the first untrained insert, whichever comes first
+RETRAIN_MIN_NEW_ROWS = int(os.getenv("RETRAIN_MIN_NEW_ROWS", "50"))
+RETRAIN_MAX_DELAY_SECONDS = float(os.getenv("RETRAIN_MAX_DELAY_SECONDS", "30"))
+
+# Serve /analytics/dashboard from the incrementally maintained rollup row
+# instead of aggregating the patients table on every request
+USE_DASHBOARD_ROLLUP = os.getenv("USE_DASHBOARD_ROLLUP", "1") == "1"
+
+# "sync" serves the database routes from the threadpool with SessionLocal;
+# "async" swaps in async def versions backed by aiosqlite
+DB_MODE = os.getenv("DB_MODE", "sync")
+
+# Storage engine
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./hospital.db")
+# Sized to Starlette's default threadpool (40 threads) so sync routes never
+# time out waiting for a connection
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB, as in PRAGMA cache_size
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+
+# Group commit: single-patient inserts arriving within this window share one
+# transaction, written by a dedicated writer thread
+GROUP_COMMIT = os.getenv("GROUP_COMMIT", "0") == "1"
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "5"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "500"))
+
+# Fast cold start (e.g. after a free-tier host wakes the service): load the
+# feature store on a background thread instead of before the first request
+FAST_STARTUP = os.getenv("FAST_STARTUP", "0") == "1"
+
+# Trained model artifacts, shared by every worker process
+MODEL_DIR = os.getenv("MODEL_DIR", "./model_artifacts")
+MODEL_KEEP_VERSIONS = int(os.getenv("MODEL_KEEP_VERSIONS", "5"))
+# How often workers check the registry for a newer model
+MODEL_POLL_SECONDS = float(os.getenv("MODEL_POLL_SECONDS", "5"))
+
+# Request profiling: with this on, requests sent with "X-Profile: 1" are
+# sampled every PROFILE_SAMPLE_INTERVAL_MS and written to PROFILE_DIR
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+
+# Conditional reads: a data version shared by every process writing to the
+# database drives ETags and an in-process cache of serialized read responses.
+# The version file defaults to "<sqlite file>.version" next to the database.
+DATA_VERSION_FILE = os.getenv("DATA_VERSION_FILE", "")
+RESPONSE_CACHE_ENTRIES = int(os.getenv("RESPONSE_CACHE_ENTRIES", "256"))
+# 0 makes clients revalidate every time (a cheap 304 when nothing changed)
+HTTP_CACHE_MAX_AGE_SECONDS = int(os.getenv("HTTP_CACHE_MAX_AGE_SECONDS", "0"))
+
+# Reminder dispatch. REMINDER_GATEWAY is "stub" or "module:Class" for a
+# ReminderGateway implementation; python reminders.py runs the dispatcher on
+# its own, or set REMINDER_DISPATCHER_IN_API=1 to run it inside the API
+REMINDER_GATEWAY = os.getenv("REMINDER_GATEWAY", "stub")
+REMINDER_DISPATCHER_IN_API = os.getenv("REMINDER_DISPATCHER_IN_API", "0") == "1"
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+REMINDER_CONCURRENCY = int(os.getenv("REMINDER_CONCURRENCY", "50"))
+REMINDER_RATE_PER_SECOND = float(os.getenv("REMINDER_RATE_PER_SECOND", "200"))
+REMINDER_MAX_ATTEMPTS = int(os.getenv("REMINDER_MAX_ATTEMPTS", "5"))
+REMINDER_BACKOFF_SECONDS = float(os.getenv("REMINDER_BACKOFF_SECONDS", "30"))
+REMINDER_SEND_TIMEOUT_SECONDS = float(os.getenv("REMINDER_SEND_TIMEOUT_SECONDS", "10"))
+# A claimed job whose dispatcher died becomes due again after this long
+REMINDER_LEASE_SECONDS = float(os.getenv("REMINDER_LEASE_SECONDS", "300"))
+REMINDER_POLL_SECONDS = float(os.getenv("REMINDER_POLL_SECONDS", "5"))
+
+# Clinic-flow simulation (POST /simulate): worker processes for the Monte
+# Carlo replications, and the size (replications x appointments x scenarios)
+# below which a run stays in the request thread
+SIMULATION_WORKERS = int(os.getenv("SIMULATION_WORKERS", str(os.cpu_count() or 1)))
+SIMULATION_INLINE_WORK = int(os.getenv("SIMULATION_INLINE_WORK", "500000"))
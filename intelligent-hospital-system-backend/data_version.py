@@ -0,0 +1,111 @@
+import mmap
+import os
+import struct
+import threading
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+# Random epoch (so a recreated file never reuses old ETags) + counter
+_LAYOUT = struct.Struct("<QQ")
+
+
+class DataVersion:
+    """Monotonic counter of committed data changes, shared through a small mmap'd file.
+
+    Every process that opens the same file (API workers, rescore.py, the bulk
+    data generator) sees the same value, so current() is a memory read and
+    needs neither a database query nor a lock. bump() increments it under a
+    file lock after a write has committed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._locked():
+            if os.fstat(self._fd).st_size < _LAYOUT.size:
+                os.pwrite(self._fd, _LAYOUT.pack(int.from_bytes(os.urandom(4), "little"), 0), 0)
+        self._map = mmap.mmap(self._fd, _LAYOUT.size)
+
+    def _locked(self):
+        return _FileLock(self._fd, self._thread_lock)
+
+    @property
+    def epoch(self):
+        return _LAYOUT.unpack_from(self._map)[0]
+
+    def current(self):
+        return _LAYOUT.unpack_from(self._map)[1]
+
+    def bump(self):
+        with self._locked():
+            epoch, version = _LAYOUT.unpack_from(self._map)
+            _LAYOUT.pack_into(self._map, 0, epoch, version + 1)
+        return version + 1
+
+    def new_epoch(self):
+        """bump() for writers that rewrote existing rows in place.
+
+        Readers that keep their own copy of the data (FeatureStore) catch up
+        on new rows by id; a new epoch tells them to reload instead.
+        """
+        with self._locked():
+            _, version = _LAYOUT.unpack_from(self._map)
+            _LAYOUT.pack_into(self._map, 0, int.from_bytes(os.urandom(4), "little"), version + 1)
+        return version + 1
+
+
+class _FileLock:
+    # flock is per open file, so threads of one process also need a mutex
+    def __init__(self, fd, thread_lock):
+        self.fd = fd
+        self.thread_lock = thread_lock
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.thread_lock.release()
+
+
+def track_writes(version, tables):
+    """Bump `version` after any Session commit that wrote to one of `tables`.
+
+    Covers unit-of-work flushes and bulk insert/update/delete statements, in
+    sync sessions and AsyncSession alike. Raw DBAPI writers must call
+    version.bump() themselves.
+    """
+    tables = frozenset(tables)
+
+    @event.listens_for(Session, "after_flush")
+    def after_flush(session, flush_context):
+        if any(obj.__table__.name in tables for obj in chain(session.new, session.dirty, session.deleted)):
+            session.info["data_changed"] = True
+
+    @event.listens_for(Session, "do_orm_execute")
+    def do_orm_execute(state):
+        if (state.is_insert or state.is_update or state.is_delete) and state.bind_mapper is not None \
+                and state.bind_mapper.local_table.name in tables:
+            state.session.info["data_changed"] = True
+
+    @event.listens_for(Session, "after_commit")
+    def after_commit(session):
+        if session.info.pop("data_changed", False):
+            version.bump()
+
+    @event.listens_for(Session, "after_rollback")
+    def after_rollback(session):
+        session.info.pop("data_changed", None)
@@ -1,19 +1,73 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, JSON
+from sqlalchemy import create_engine, event, inspect, text, Column, ForeignKey, Index, Integer, String, Float, JSON
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex
 import json
+import config
+from metrics import TimedQueuePool, instrument_engine
+from data_version import DataVersion, track_writes
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./hospital.db"
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Indexes older schemas created that a composite index now covers; dropped so inserts stop maintaining them
+RETIRED_INDEXES = ["ix_patients_age_group"]
+
+def is_file_sqlite(url):
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+def engine_options(url):
+    if not is_file_sqlite(url):
+        return {}
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT_SECONDS,
+        "connect_args": {"check_same_thread": False, "timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000},
+    }
+
+def configure_sqlite(engine):
+    """Apply the tuning PRAGMAs to every new connection of a file-backed SQLite engine."""
+    if not is_file_sqlite(engine.url):
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers proceed while a writer commits
+        cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+        # NORMAL only fsyncs at checkpoints in WAL mode; still safe against corruption
+        cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={config.SQLITE_CACHE_SIZE}")
+        cursor.close()
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+configure_sqlite(engine)
+instrument_engine(engine, "sync")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 class Patient(Base):
     __tablename__ = "patients"
+    # Cohort search: equality filters first, then the risk range/sort column.
+    # SQLite appends the rowid (id) to every index, which keyset paging relies on.
+    __table_args__ = (
+        Index("ix_patients_location_age_group_risk", "location", "age_group", "no_show_probability"),
+        Index("ix_patients_age_group_risk", "age_group", "no_show_probability"),
+        Index("ix_patients_education_risk", "education", "no_show_probability"),
+        Index("ix_patients_risk", "no_show_probability"),
+        # The satisfaction score that drives risk; other score thresholds filter within these seeks
+        Index("ix_patients_accessibility", "accessibility_score"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    age_group = Column(String, index=True)
+    # ix_patients_age_group_risk serves age_group lookups; no index of its own
+    age_group = Column(String)
     gender = Column(String)
     education = Column(String)
     income_level = Column(String)
@@ -30,5 +84,124 @@ class Patient(Base):
     preferred_contact = Column(String)
     last_appointment = Column(String)
     next_appointment = Column(String)
+    # ISO date and time, clinic local time; NULL for patients added before it was recorded
+    created_at = Column(String, index=True)
+
+class DashboardRollup(Base):
+    """Running totals behind /analytics/dashboard, kept in step with patients on every insert."""
+    __tablename__ = "dashboard_rollup"
+
+    id = Column(Integer, primary_key=True)
+    total_patients = Column(Integer, nullable=False, default=0)
+    high_risk_patients = Column(Integer, nullable=False, default=0)
+    physical_env_sum = Column(Float, nullable=False, default=0.0)
+    technical_quality_sum = Column(Float, nullable=False, default=0.0)
+    interpersonal_sum = Column(Float, nullable=False, default=0.0)
+    communication_sum = Column(Float, nullable=False, default=0.0)
+    accessibility_sum = Column(Float, nullable=False, default=0.0)
+
+class PatientDailyRollup(Base):
+    """Per day, location and age group totals behind /analytics/timeseries, kept in step with patients on every insert."""
+    __tablename__ = "patient_daily_rollup"
+
+    day = Column(String, primary_key=True)  # ISO date of Patient.created_at
+    location = Column(String, primary_key=True)
+    age_group = Column(String, primary_key=True)
+    total_patients = Column(Integer, nullable=False, default=0)
+    high_risk_patients = Column(Integer, nullable=False, default=0)
+    physical_env_sum = Column(Float, nullable=False, default=0.0)
+    technical_quality_sum = Column(Float, nullable=False, default=0.0)
+    interpersonal_sum = Column(Float, nullable=False, default=0.0)
+    communication_sum = Column(Float, nullable=False, default=0.0)
+    accessibility_sum = Column(Float, nullable=False, default=0.0)
+
+class Appointment(Base):
+    """One booked clinic slot. Several patients may share a slot when their no-show risk allows overbooking."""
+    __tablename__ = "appointments"
+    __table_args__ = (
+        Index("ix_appointments_day_clinic_clinician", "day", "clinic", "clinician"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False, index=True)
+    clinic = Column(String, nullable=False)
+    clinician = Column(String, nullable=False)
+    day = Column(String, nullable=False)  # ISO date
+    starts_at = Column(String, nullable=False)  # ISO date and time, as stored in Patient.next_appointment
+    no_show_probability = Column(Float, nullable=False)
+    expected_attendance = Column(Float, nullable=False)
+
+class ReminderJob(Base):
+    """A reminder to send before an appointment; picked up by the reminder dispatcher."""
+    __tablename__ = "reminder_jobs"
+    __table_args__ = (
+        # The dispatcher's claim query: due jobs in pending/sending
+        Index("ix_reminder_jobs_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    appointment_id = Column(Integer, ForeignKey("appointments.id"), nullable=False, index=True)
+    channel = Column(String, nullable=False)
+    message = Column(String, nullable=False)
+    # Unique per appointment, channel and lead time; also passed to the gateway so a retried send is not duplicated
+    idempotency_key = Column(String, nullable=False, unique=True)
+    send_at = Column(String, nullable=False)  # ISO, clinic local time
+    status = Column(String, nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    # When the job is next due; while sending, when the dispatcher's claim lapses
+    next_attempt_at = Column(String, nullable=False)
+    last_error = Column(String)
+    provider_message_id = Column(String)
+    sent_at = Column(String)
+
+def data_version_path(url):
+    if config.DATA_VERSION_FILE:
+        return config.DATA_VERSION_FILE
+    if is_file_sqlite(url):
+        return f"{make_url(url).database}.version"
+    return "./data_version"
+
+# Bumped after every commit touching patient data, by any process sharing the database
+data_version = DataVersion(data_version_path(SQLALCHEMY_DATABASE_URL))
+track_writes(data_version, {Patient.__tablename__, DashboardRollup.__tablename__, PatientDailyRollup.__tablename__})
+
+def add_missing_columns():
+    """ALTER TABLE ADD COLUMN for model columns an existing table predates (e.g. patients.created_at).
+
+    Only for nullable columns without server defaults, which is how new
+    columns are added to existing tables here; old rows read as NULL.
+    """
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                    ))
+
+def init_db():
+    """Create missing tables and indexes.
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Called from the API's startup and by scripts that may run first, not on
+    import, so importing the models (e.g. in the training worker) stays cheap.
+    """
+    # uvicorn --workers N starts every worker at once; a worker that loses
+    # the race to create a table or add a column just re-checks the schema
+    try:
+        Base.metadata.create_all(bind=engine)
+        add_missing_columns()
+    except OperationalError:
+        Base.metadata.create_all(bind=engine)
+        add_missing_columns()
+    # create_all skips existing tables, so indexes added later are created here
+    with engine.begin() as conn:
+        for name in RETIRED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
\ No newline at end of file
@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from database import Patient
+
+EXPORT_COLUMNS = [column for column in Patient.__table__.columns]
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def iter_patient_batches(session_factory, batch_size=EXPORT_BATCH_SIZE):
+    """Yield lists of row tuples from a server-side cursor; memory stays at one batch."""
+    with session_factory() as db:
+        result = db.execute(
+            select(*EXPORT_COLUMNS).order_by(Patient.id).execution_options(yield_per=batch_size)
+        )
+        for batch in result.partitions():
+            yield batch
+
+
+def iter_ndjson(batches):
+    names = [column.name for column in EXPORT_COLUMNS]
+    for batch in batches:
+        yield "".join(json.dumps(dict(zip(names, row))) + "\n" for row in batch)
+
+
+def iter_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in EXPORT_COLUMNS])
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, when the table is empty
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_patients(session_factory, fmt):
+    batches = iter_patient_batches(session_factory)
+    return iter_csv(batches) if fmt == "csv" else iter_ndjson(batches)
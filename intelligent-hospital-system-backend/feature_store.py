@@ -0,0 +1,152 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+from sqlalchemy import case, select
+
+from analytics import SATISFACTION_FIELDS
+from database import Patient
+from scoring import HIGH_RISK_THRESHOLD
+
+# (feature, column, value): 1.0 when the column equals value, as the forest sees it
+FLAG_FEATURES = [
+    ("age_48_plus", Patient.age_group, "48+"),  # 48% were 48+ - higher risk
+    ("female", Patient.gender, "Female"),  # 73% female
+    ("primary_education", Patient.education, "Primary"),  # Education affects health literacy
+]
+# Every satisfaction score, in the dashboard's order
+SCORE_COLUMNS = [column for _, column, _ in SATISFACTION_FIELDS]
+TRAINING_SCORES = ["physical_env_score", "accessibility_score"]  # accessibility: 61.4% satisfaction - key factor
+
+# The model's input columns, in order
+FEATURE_SCHEMA = [name for name, _, _ in FLAG_FEATURES] + TRAINING_SCORES
+_TRAINING_SCORE_INDEXES = [[column.key for column in SCORE_COLUMNS].index(name) for name in TRAINING_SCORES]
+
+LOAD_CHUNK_SIZE = 50_000
+MIN_CAPACITY = 1024
+
+
+def patient_features(patient):
+    """FEATURE_SCHEMA vector for one patient-like object, encoded as the store encodes rows."""
+    return [1.0 if getattr(patient, column.key) == value else 0.0 for _, column, value in FLAG_FEATURES] + [
+        getattr(patient, name) for name in TRAINING_SCORES
+    ]
+
+
+def _feature_query():
+    # Flags are encoded by SQLite, so every fetched row is plain numbers
+    return select(
+        Patient.id,
+        *[case((column == value, 1.0), else_=0.0) for _, column, value in FLAG_FEATURES],
+        *SCORE_COLUMNS,
+        Patient.no_show_probability,
+    )
+
+
+# One consistent view of the store: arrays may have spare capacity past `size`
+Columns = namedtuple("Columns", ["size", "ids", "flags", "scores", "probabilities"])
+
+
+def _empty_columns(capacity):
+    return Columns(
+        size=0,
+        ids=np.empty(capacity, dtype=np.int64),
+        flags=np.empty((capacity, len(FLAG_FEATURES)), dtype=np.float64),
+        scores=np.empty((capacity, len(SCORE_COLUMNS)), dtype=np.float64),
+        probabilities=np.empty(capacity, dtype=np.float64),
+    )
+
+
+def _append(columns, rows):
+    """Write rows (id, *flags, *scores, probability) after columns.size, growing the arrays if needed."""
+    block = np.array(rows, dtype=np.float64)  # NULLs become NaN
+    start, end = columns.size, columns.size + len(block)
+    capacity = len(columns.ids)
+    if end > capacity:
+        while capacity < end:
+            capacity *= 2
+        grown = _empty_columns(capacity)
+        for old, new in zip(columns[1:], grown[1:]):
+            new[:start] = old[:start]
+        columns = grown
+    flag_end = 1 + len(FLAG_FEATURES)
+    score_end = flag_end + len(SCORE_COLUMNS)
+    columns.ids[start:end] = block[:, 0]
+    columns.flags[start:end] = block[:, 1:flag_end]
+    columns.scores[start:end] = block[:, flag_end:score_end]
+    columns.probabilities[start:end] = block[:, score_end]
+    return columns._replace(size=end)
+
+
+class FeatureStore:
+    """Model features and satisfaction scores of every patient as growable NumPy columns.
+
+    refresh() bulk-loads the table once, then appends only rows with an id
+    above the last one loaded, and only when the shared DataVersion shows a
+    commit since the previous refresh, so a refresh with nothing new costs
+    no query. Arrays double in capacity when full. New rows are written past
+    the published size and then published with the rest in one assignment,
+    so readers never take a lock and never see a partial row.
+
+    Rows rewritten in place (rescore.py) are not picked up by appending;
+    those writers start a new DataVersion epoch, which triggers a full reload.
+    """
+
+    def __init__(self, engine, data_version):
+        self.engine = engine
+        self.data_version = data_version
+        self._columns = _empty_columns(MIN_CAPACITY)
+        self._synced = None  # (epoch, version) as of the last refresh
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._columns.size
+
+    @property
+    def columns(self):
+        return self._columns
+
+    def refresh(self):
+        """Bring the columns up to date with the patients table; returns the number of rows added."""
+        synced = (self.data_version.epoch, self.data_version.current())
+        if synced == self._synced:
+            return 0
+        with self._lock:
+            if synced == self._synced:
+                return 0
+            columns = self._columns
+            if self._synced is not None and synced[0] != self._synced[0]:
+                columns = _empty_columns(len(columns.ids))
+            start = columns.size
+            last_id = int(columns.ids[columns.size - 1]) if columns.size else 0
+            query = _feature_query().where(Patient.id > last_id).order_by(Patient.id)
+            compiled = query.compile(dialect=self.engine.dialect)
+            with self.engine.connect() as connection:
+                # Plain DBAPI tuples convert to arrays several times faster than Row objects
+                cursor = connection.connection.cursor()
+                try:
+                    cursor.execute(str(compiled), [compiled.params[name] for name in compiled.positiontup])
+                    while True:
+                        rows = cursor.fetchmany(LOAD_CHUNK_SIZE)
+                        if not rows:
+                            break
+                        columns = _append(columns, rows)
+                finally:
+                    cursor.close()
+            self._columns = columns
+            # Versions read before the query: a commit racing with it is caught next time
+            self._synced = synced
+            return columns.size - start
+
+    def training_matrix(self):
+        """A copy of the model inputs (FEATURE_SCHEMA columns), one row per patient."""
+        columns = self._columns
+        return np.hstack([columns.flags[:columns.size], columns.scores[:columns.size, _TRAINING_SCORE_INDEXES]])
+
+    def dashboard_totals(self):
+        """(patients, high-risk patients, sum of each satisfaction score), as analytics reads them."""
+        columns = self._columns
+        high_risk = int(np.count_nonzero(columns.probabilities[:columns.size] > HIGH_RISK_THRESHOLD))
+        # NULL scores count towards the total but not the sums, as in SQL
+        sums = np.nansum(columns.scores[:columns.size], axis=0).tolist()
+        return columns.size, high_risk, sums
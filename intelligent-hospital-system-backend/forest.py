@@ -0,0 +1,198 @@
+from bisect import bisect_left
+
+import numpy as np
+
+# Largest threshold grid precomputed at compile time (one walk per cell)
+MAX_GRID_CELLS = 16_384
+# Largest grid over the integer input domain, used when the threshold grid is too big
+# (0-100 scores: 2 * 2 * 2 * 101 * 101 cells, about 650 KB)
+MAX_INTEGER_GRID_CELLS = 131_072
+WALK_CHUNK_ROWS = 2048
+
+
+class CompiledForest:
+    """A fitted binary RandomForestClassifier flattened into contiguous node arrays.
+
+    Every tree's nodes are concatenated into one set of arrays (feature,
+    threshold, left, right, leaf probability), with child indexes made
+    absolute. Every (row, tree) pair is walked at once, one level per NumPy
+    step with no per-tree Python loop, and pairs drop out of the active set
+    as they reach a leaf, so the work follows the actual path lengths rather
+    than the deepest tree.
+
+    When the trees split each feature on only a few distinct thresholds, the
+    forest is constant inside every cell of the grid those thresholds form.
+    The probability of each cell is then precomputed, as CompiledRiskRules
+    does for the rules, and a prediction is one bisect per feature plus one
+    table read.
+
+    Forests fit on integer features over a wide range (0-100 satisfaction
+    scores) split on nearly every half step, and that grid gets too large.
+    Such forests get a grid over the integer values between their lowest
+    and highest thresholds instead. Integer inputs are looked up there,
+    after clamping to that range. Other inputs take the node-array walk.
+
+    Output matches predict_proba(X)[:, 1].
+    """
+
+    def __init__(self, model):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        positive = list(model.classes_).index(1) if 1 in model.classes_ else None
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+
+        features, thresholds, lefts, rights, values = [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            leaf = tree.children_left == -1
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            # Leaves keep -1 so is_leaf can be read off the array
+            lefts.append(np.where(leaf, -1, tree.children_left + offset))
+            rights.append(np.where(leaf, -1, tree.children_right + offset))
+            # Leaf values are class counts (or weights); normalise to probabilities
+            counts = tree.value[:, 0, :]
+            totals = counts.sum(axis=1)
+            if positive is None:
+                values.append(np.zeros(tree.node_count))
+            else:
+                values.append(counts[:, positive] / np.where(totals > 0, totals, 1))
+
+        self.n_features = model.n_features_in_
+        self.n_trees = len(trees)
+        self.roots = offsets.astype(np.intp)
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds)
+        self.left = np.concatenate(lefts).astype(np.intp)
+        self.right = np.concatenate(rights).astype(np.intp)
+        self.value = np.concatenate(values)
+        self.is_leaf = self.left == -1
+        self._build_grid()
+
+    # Arrays that fully describe a compiled forest, as written by save()
+    _SAVED = ["roots", "feature", "threshold", "left", "right", "value"]
+
+    def save(self, path):
+        """Write the arrays (and grid) to an .npz that load() reads without scikit-learn."""
+        arrays = {name: getattr(self, name) for name in self._SAVED}
+        arrays["n_features"] = np.array(self.n_features)
+        arrays["grid_cut_counts"] = np.array([len(cuts) for cuts in self.grid_thresholds])
+        arrays["grid_cuts"] = np.array([cut for cuts in self.grid_thresholds for cut in cuts], dtype=np.float64)
+        if self.grid is not None:
+            arrays["grid"] = self.grid
+        if self.integer_grid is not None:
+            arrays["integer_grid"] = self.integer_grid
+            arrays["integer_low"] = self.integer_low
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        forest = cls.__new__(cls)
+        with np.load(path) as arrays:
+            for name in cls._SAVED:
+                setattr(forest, name, arrays[name])
+            forest.n_features = int(arrays["n_features"])
+            cuts = arrays["grid_cuts"].tolist()
+            bounds = np.cumsum([0] + arrays["grid_cut_counts"].tolist())
+            forest.grid_thresholds = [cuts[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+            forest.grid = arrays["grid"] if "grid" in arrays.files else None
+            forest.integer_grid = arrays["integer_grid"] if "integer_grid" in arrays.files else None
+            forest.integer_low = arrays["integer_low"] if "integer_low" in arrays.files else None
+        forest.n_trees = len(forest.roots)
+        forest.is_leaf = forest.left == -1
+        return forest
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    def _build_grid(self):
+        split = ~self.is_leaf
+        self.grid_thresholds = [
+            np.unique(self.threshold[split & (self.feature == feature)]).tolist()
+            for feature in range(self.n_features)
+        ]
+        shape = [len(cuts) + 1 for cuts in self.grid_thresholds]
+        self.grid = self.integer_grid = self.integer_low = None
+        if np.prod(shape) <= MAX_GRID_CELLS:
+            # Bin i holds values in (cut[i - 1], cut[i]]; the cut itself represents it, the last bin cut[-1] + 1
+            representatives = [np.array(cuts + [cuts[-1] + 1.0 if cuts else 0.0]) for cuts in self.grid_thresholds]
+            self.grid = self._cells(representatives).reshape(shape)
+            return
+        # Every integer at or below the lowest cut behaves like floor(lowest cut), every one above the highest
+        # like floor(highest cut) + 1, so integers clamped to that range cover all integer inputs
+        low = np.array([np.floor(cuts[0]) if cuts else 0.0 for cuts in self.grid_thresholds])
+        high = np.array([np.floor(cuts[-1]) + 1.0 if cuts else 0.0 for cuts in self.grid_thresholds])
+        shape = (high - low + 1).astype(np.intp)
+        if np.prod(shape) > MAX_INTEGER_GRID_CELLS:
+            return
+        self.integer_low = low
+        self.integer_grid = self._cells([np.arange(lo, hi + 1.0) for lo, hi in zip(low, high)]).reshape(shape)
+
+    def _cells(self, representatives):
+        cells = np.stack(np.meshgrid(*representatives, indexing="ij"), axis=-1).reshape(-1, self.n_features)
+        return self._walk(cells)
+
+    def _integer_cells(self, X):
+        # (integer grid indexes of every row, clamped to the grid; mask of rows whose values are all integers)
+        indexes = np.clip(X - self.integer_low, 0, np.array(self.integer_grid.shape) - 1).astype(np.intp)
+        return indexes, (X == np.floor(X)).all(axis=1)
+
+    def _walk(self, X):
+        # X is float64 and already rounded as the trees saw it during fit
+        probabilities = np.empty(len(X))
+        for start in range(0, len(X), WALK_CHUNK_ROWS):
+            chunk = X[start:start + WALK_CHUNK_ROWS]
+            nodes = np.tile(self.roots, len(chunk))
+            rows = np.repeat(np.arange(len(chunk)), self.n_trees)
+            active = np.flatnonzero(~self.is_leaf[nodes])
+            while active.size:
+                current = nodes[active]
+                current = np.where(chunk[rows[active], self.feature[current]] <= self.threshold[current],
+                                   self.left[current], self.right[current])
+                nodes[active] = current
+                active = active[~self.is_leaf[current]]
+            probabilities[start:start + WALK_CHUNK_ROWS] = self.value[nodes].reshape(len(chunk), -1).mean(axis=1)
+        return probabilities
+
+    def predict_one(self, features):
+        """Positive-class probability for a single feature vector."""
+        # The trees were fit on float32 inputs; compare the same way
+        x = np.asarray(features, dtype=np.float32).astype(np.float64)
+        if self.grid is not None:
+            return float(self.grid[tuple(
+                bisect_left(cuts, value) for cuts, value in zip(self.grid_thresholds, x.tolist())
+            )])
+        if self.integer_grid is not None:
+            values = x.tolist()
+            if all(value.is_integer() for value in values):
+                return float(self.integer_grid[tuple(
+                    min(max(int(value - low), 0), size - 1)
+                    for value, low, size in zip(values, self.integer_low.tolist(), self.integer_grid.shape)
+                )])
+        nodes = self.roots.copy()
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while active.size:
+            current = nodes[active]
+            current = np.where(x[self.feature[current]] <= self.threshold[current],
+                               self.left[current], self.right[current])
+            nodes[active] = current
+            active = active[~self.is_leaf[current]]
+        return float(self.value[nodes].mean())
+
+    def predict(self, X):
+        """Positive-class probabilities for a (rows, features) matrix."""
+        X = np.asarray(X, dtype=np.float32).astype(np.float64).reshape(-1, self.n_features)
+        if self.grid is not None:
+            bins = tuple(
+                np.searchsorted(cuts, X[:, feature], side="left")
+                for feature, cuts in enumerate(self.grid_thresholds)
+            )
+            return self.grid[bins]
+        if self.integer_grid is not None:
+            indexes, integral = self._integer_cells(X)
+            probabilities = np.empty(len(X))
+            probabilities[integral] = self.integer_grid[tuple(indexes[integral].T)]
+            if not integral.all():
+                probabilities[~integral] = self._walk(X[~integral])
+            return probabilities
+        return self._walk(X)
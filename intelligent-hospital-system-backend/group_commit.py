@@ -0,0 +1,110 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """Coalesces single-row writes that arrive close together into one transaction.
+
+    submit() queues a row and returns a Future. The writer thread takes the
+    first queued row, keeps collecting for up to `window` seconds or
+    `max_batch` rows, writes them with write_batch(db, rows) and commits once.
+    Concurrent writers then share one lock acquisition and one WAL sync instead
+    of queueing on the database lock. If a batch fails, its rows are retried
+    one at a time so a bad row only fails its own future.
+    """
+
+    def __init__(self, session_factory, write_batch, window, max_batch):
+        self.session_factory = session_factory
+        self.write_batch = write_batch
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def submit(self, row):
+        if self._thread is None:
+            raise RuntimeError("GroupCommitWriter has not been started")
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stopping = self._collect(item)
+            self._write(batch)
+        # Anything queued behind the stop marker still gets written
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._write(leftovers)
+
+    def _write(self, batch):
+        rows = [row for row, _ in batch]
+        try:
+            results = self._commit(rows)
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0][1].set_exception(exc)
+                return
+            logger.warning("Group commit of %d rows failed, retrying individually: %s", len(batch), exc)
+            for item in batch:
+                self._write([item])
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _commit(self, rows):
+        with self.session_factory() as db:
+            try:
+                results = self.write_batch(db, rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        return results
@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+
+from fastapi import Response
+
+import metrics
+
+http_cache_requests = metrics.Counter(
+    "http_cache_requests_total", "Conditional reads by outcome (not_modified, hit, miss)", ("route", "result"),
+)
+
+
+class ResponseCache:
+    """ETag/304 handling and an LRU of serialized bodies for read routes.
+
+    The ETag is the shared DataVersion, so If-None-Match is answered from a
+    memory read. Bodies are cached per (path, query, version): once a write
+    bumps the version, older entries are simply never asked for again and
+    age out of the LRU.
+    """
+
+    def __init__(self, data_version, max_entries=256, max_age=0):
+        self.data_version = data_version
+        self.max_entries = max_entries
+        self.cache_control = f"private, max-age={max_age}" if max_age > 0 else "private, no-cache"
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _etag(self, version):
+        return f'W/"{self.data_version.epoch:x}-{version}"'
+
+    def lookup(self, request):
+        """Returns (key, response); response is a 304 or a cached 200, or None on a miss."""
+        version = self.data_version.current()
+        etag = self._etag(version)
+        key = (request.url.path, tuple(sorted(request.query_params.multi_items())), version)
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+            http_cache_requests.inc(request.url.path, "not_modified")
+            return key, Response(status_code=304, headers=headers)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            http_cache_requests.inc(request.url.path, "miss")
+            return key, None
+        http_cache_requests.inc(request.url.path, "hit")
+        body, media_type, extra_headers = entry
+        return key, Response(content=body, media_type=media_type, headers={**extra_headers, **headers})
+
+    def store(self, key, body, extra_headers=None, media_type="application/json"):
+        """Cache a serialized body (JSON unless media_type says otherwise) under the key from lookup() and return it."""
+        extra_headers = dict(extra_headers or {})
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = (body, media_type, extra_headers)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        headers = {**extra_headers, "ETag": self._etag(key[-1]), "Cache-Control": self.cache_control}
+        return Response(content=body, media_type=media_type, headers=headers)
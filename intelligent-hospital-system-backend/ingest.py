@@ -0,0 +1,127 @@
+import csv
+import json
+from datetime import datetime
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from analytics import apply_rollups
+from database import Patient
+from models import PatientCreate
+from scoring import RISK_FIELDS, no_show_probabilities, no_show_probability
+
+MAX_CHUNK_SIZE = 10_000
+DEFAULT_CONTACT = "SMS"
+
+
+def new_patient_values(patient):
+    """Column values for a single new patient, including its intake risk score."""
+    return {
+        **patient.dict(),
+        # Calculate no-show probability based on your research factors
+        "no_show_probability": no_show_probability(patient),
+        "preferred_contact": DEFAULT_CONTACT,
+        "created_at": created_at(),
+    }
+
+
+def created_at():
+    # Clinic local time, as the timeseries buckets days
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def insert_patient_rows(db, rows, use_rollup):
+    """Insert column-value dicts and keep the rollups in step; returns ids in row order.
+
+    Does not commit, so callers decide what shares the transaction.
+    """
+    # A list of parameter sets runs as batched multi-row INSERTs
+    ids = db.scalars(insert(Patient).returning(Patient.id, sort_by_parameter_order=True), rows).all()
+    if use_rollup:
+        apply_rollups(db, rows)
+    return ids
+
+
+async def iter_lines(byte_stream):
+    """Split an async stream of byte chunks into decoded lines, without buffering the body."""
+    pending = b""
+    async for chunk in byte_stream:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if pending:
+        yield pending.decode("utf-8-sig").rstrip("\r")
+
+
+async def iter_records(lines, fmt):
+    """Yield (row_number, record) pairs; record is a dict, or an error message for unparseable rows."""
+    header = None
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        if fmt == "csv" and header is None:
+            header = next(csv.reader([line]))
+            continue
+        row_number += 1
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if len(values) != len(header):
+                yield row_number, f"expected {len(header)} columns, got {len(values)}"
+            else:
+                yield row_number, dict(zip(header, values))
+        else:
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield row_number, f"invalid JSON: {exc}"
+                continue
+            yield row_number, record if isinstance(record, dict) else "expected a JSON object"
+
+
+def _validate(records):
+    valid_rows, row_numbers, errors = [], [], []
+    for row_number, record in records:
+        if isinstance(record, str):
+            errors.append({"row": row_number, "errors": [record]})
+            continue
+        try:
+            patient = PatientCreate(**record)
+        except ValidationError as exc:
+            errors.append({"row": row_number, "errors": [
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+            ]})
+            continue
+        valid_rows.append(patient.dict())
+        row_numbers.append(row_number)
+    return valid_rows, row_numbers, errors
+
+
+def insert_chunk(session_factory, records, use_rollup):
+    """Validate, score and insert one chunk in a single transaction.
+
+    Returns (inserted_count, row_errors). A database failure rejects only this chunk.
+    """
+    rows, row_numbers, errors = _validate(records)
+    if not rows:
+        return 0, errors
+
+    probabilities = no_show_probabilities({field: [row[field] for row in rows] for field in RISK_FIELDS})
+    timestamp = created_at()
+    for row, probability in zip(rows, probabilities.tolist()):
+        row["no_show_probability"] = probability
+        row["preferred_contact"] = DEFAULT_CONTACT
+        row["created_at"] = timestamp
+
+    with session_factory() as db:
+        try:
+            insert_patient_rows(db, rows, use_rollup)
+            db.commit()
+        except SQLAlchemyError as exc:
+            db.rollback()
+            message = f"database error: {exc.__class__.__name__}"
+            errors.extend({"row": row_number, "errors": [message]} for row_number in row_numbers)
+            return 0, sorted(errors, key=lambda error: error["row"])
+    return len(rows), errors
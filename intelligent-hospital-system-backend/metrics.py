@@ -0,0 +1,274 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Every uvicorn worker keeps its own registry, so with --workers N each scrape
+of /metrics reports the worker that happened to answer; the pid label on
+process_info tells them apart.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Starlette appends "; charset=utf-8" to text/ media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+POOL_WAIT_BUCKETS = (0.00001, 0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+TRAINING_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_registry = []
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._samples(labels, value))
+        return lines
+
+    def _samples(self, labels, value):
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """A settable gauge, or one read at scrape time from collect() -> {labels: value}."""
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), collect=None):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def render(self):
+        if self.collect is not None:
+            try:
+                values = self.collect()
+            except Exception:
+                values = {}
+            with self._lock:
+                self._values = dict(values)
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self, labels, state):
+        counts, total, count = state
+        names = self.labelnames + ("le",)
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}")
+        label_text = _format_labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+        lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time from request start to the last body byte, per route template",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "Requests currently being served")
+
+# Database
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "Time spent in cursor.execute/executemany", ("statement",), QUERY_BUCKETS,
+)
+db_query_errors = Counter("db_query_errors_total", "Statements that raised a DBAPI error", ("statement",))
+db_pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time to check out a connection, including opening a new one", ("engine",), POOL_WAIT_BUCKETS,
+)
+
+# Model training
+model_training_duration = Histogram(
+    "model_training_duration_seconds", "Wall time of a background training job (load, fit and publish)",
+    ("outcome",), TRAINING_BUCKETS,
+)
+model_version = Gauge("model_version", "Version of the model this worker serves")
+model_training_rows = Gauge("model_training_rows", "Patients the served model was trained on")
+model_fit_seconds = Gauge("model_fit_seconds", "Time RandomForestClassifier.fit took for the served model")
+
+process_info = Gauge("process_info", "Constant 1, labelled with the worker pid", ("pid",))
+process_info.set(1, str(os.getpid()))
+
+
+def _statement_kind(statement):
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+_engines = {}
+
+
+def _pool_states():
+    values = {}
+    for label, engine in list(_engines.items()):
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            values[(label, "checked_out")] = pool.checkedout()
+            values[(label, "idle")] = pool.checkedin()
+            values[(label, "overflow")] = max(0, pool.overflow())
+            values[(label, "size")] = pool.size()
+    return values
+
+
+db_pool_connections = Gauge(
+    "db_pool_connections", "Connections per pool state, read at scrape time", ("engine", "state"), collect=_pool_states,
+)
+
+
+def instrument_engine(engine, label):
+    """Time every statement an engine runs and report its pool; pass async engines' .sync_engine."""
+    _engines[label] = engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started_at"].pop()
+        db_query_duration.observe(time.perf_counter() - started, _statement_kind(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        started_at = context.connection.info.get("query_started_at") if context.connection is not None else None
+        if started_at:
+            started_at.pop()
+        db_query_errors.inc(_statement_kind(context.statement or ""))
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a free connection."""
+    metrics_label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - started, self.metrics_label)
+
+
+class TimedAsyncAdaptedQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request against the route template it matched."""
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths = {}
+
+    def _route_label(self, scope):
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            # Routes can be swapped at import time (DB_MODE=async), so map lazily
+            for route in scope["app"].router.routes:
+                self._route_paths[getattr(route, "endpoint", None)] = getattr(route, "path", "unmatched")
+            path = self._route_paths.get(endpoint, "unmatched")
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            http_request_duration.observe(
+                time.perf_counter() - started, scope["method"], self._route_label(scope), str(status)
+            )
@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from forest import CompiledForest
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+LATEST_MARKER = "LATEST"
+COMPILED_FILE = "forest.npz"
+
+
+class ModelRegistry:
+    """Versioned on-disk store of trained models shared by every worker process.
+
+    Each version lives in its own directory: model.joblib (the fitted
+    estimator), forest.npz (its CompiledForest) and metadata.json. The API
+    serves forest.npz, which loads in milliseconds without importing
+    scikit-learn or joblib. The LATEST file names the current version and
+    is replaced atomically, so readers only ever see fully written artifacts.
+    """
+
+    def __init__(self, root, keep_versions=5):
+        self.root = root
+        self.keep_versions = max(1, keep_versions)
+        os.makedirs(root, exist_ok=True)
+
+    def _version_dir(self, version):
+        return os.path.join(self.root, f"v{version:06d}")
+
+    def versions(self):
+        return sorted(int(name[1:]) for name in os.listdir(self.root)
+                      if name.startswith("v") and name[1:].isdigit())
+
+    def latest_version(self):
+        try:
+            with open(os.path.join(self.root, LATEST_MARKER)) as marker:
+                return int(marker.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def load(self, version):
+        """(CompiledForest, metadata) for a published version."""
+        directory = self._version_dir(version)
+        with open(os.path.join(directory, "metadata.json")) as f:
+            metadata = json.load(f)
+        compiled_path = os.path.join(directory, COMPILED_FILE)
+        if os.path.exists(compiled_path):
+            return CompiledForest.load(compiled_path), metadata
+        # Published before compiled artifacts existed
+        import joblib
+        return CompiledForest(joblib.load(os.path.join(directory, "model.joblib"))), metadata
+
+    def publish(self, model, training_rows, feature_schema, fit_seconds=None):
+        """Write a new version and point LATEST at it; returns the version number."""
+        import joblib
+        # Compiled once here, in the training process, rather than by every API worker
+        compiled = CompiledForest(model)
+        with self._lock(".publish.lock"):
+            versions = self.versions()
+            version = versions[-1] + 1 if versions else 1
+            metadata = {
+                "version": version,
+                "trained_at": datetime.now(timezone.utc).isoformat(),
+                "training_rows": training_rows,
+                "feature_schema": feature_schema,
+                "fit_seconds": fit_seconds,
+                "model_class": type(model).__name__,
+            }
+            staging = tempfile.mkdtemp(dir=self.root, prefix=".staging-")
+            joblib.dump(model, os.path.join(staging, "model.joblib"))
+            compiled.save(os.path.join(staging, COMPILED_FILE))
+            with open(os.path.join(staging, "metadata.json"), "w") as f:
+                json.dump(metadata, f, indent=2)
+            os.rename(staging, self._version_dir(version))
+
+            marker = os.path.join(self.root, f".{LATEST_MARKER}.tmp")
+            with open(marker, "w") as f:
+                f.write(str(version))
+            os.replace(marker, os.path.join(self.root, LATEST_MARKER))
+
+            # Older versions beyond the retention window are no longer served by anyone
+            for old in (versions + [version])[:-self.keep_versions]:
+                shutil.rmtree(self._version_dir(old), ignore_errors=True)
+        return version
+
+    @contextmanager
+    def training_lock(self):
+        """Non-blocking cross-process lock; yields False if another worker is already training."""
+        with self._lock(".train.lock", blocking=False) as acquired:
+            yield acquired
+
+    @contextmanager
+    def _lock(self, name, blocking=True):
+        if fcntl is None:
+            yield True
+            return
+        with open(os.path.join(self.root, name), "a") as handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
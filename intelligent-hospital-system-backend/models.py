@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import Dict, List, Optional
 
 class PatientBase(BaseModel):
     age_group: str
@@ -20,14 +21,165 @@ class Patient(PatientBase):
     id: int
     no_show_probability: float
     preferred_contact: str
+    last_appointment: Optional[str] = None
+    next_appointment: Optional[str] = None
+    created_at: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+class BulkRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+class BulkIngestResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkRowError]
+
 class PredictionRequest(BaseModel):
     patient_data: PatientBase
 
 class PredictionResponse(BaseModel):
     no_show_probability: float
     risk_level: str
-    recommended_actions: List[str]
\ No newline at end of file
+    recommended_actions: List[str]
+    # Version of the forest that scored this request; None while the risk rules are used
+    model_version: Optional[int] = None
+
+    class Config:
+        # model_version is a field name here, not pydantic's model_ API
+        protected_namespaces = ()
+
+class TimeseriesPoint(BaseModel):
+    period: str  # e.g. 2024-03-05 (day, or the Monday of a week), 2024-03 (month), 2024 (year)
+    group: Optional[str] = None  # location or age group when grouped
+    total_patients: int
+    high_risk_patients: int
+    high_risk_percentage: float
+    average_satisfaction_scores: Dict[str, float]
+
+class Timeseries(BaseModel):
+    bucket: str
+    group_by: Optional[str] = None
+    start: date
+    end: date
+    points: List[TimeseriesPoint]
+
+class ModelStatus(BaseModel):
+    is_trained: bool
+    version: int
+    trained_at: Optional[datetime] = None
+    training_rows: int
+    pending_rows: int
+    training_in_progress: bool
+    last_error: Optional[str] = None
+
+class ClinicConfig(BaseModel):
+    name: str  # matches Patient.location
+    clinicians: List[str] = ["Clinician 1", "Clinician 2", "Clinician 3"]
+    day_start: str = "08:00"
+    slot_minutes: int = Field(30, gt=0)
+    slots_per_day: int = Field(16, gt=0)
+
+class ScheduleRequest(BaseModel):
+    start_date: date
+    days: int = Field(5, gt=0, le=90)
+    include_weekends: bool = False
+    # Defaults to one clinic per patient location
+    clinics: Optional[List[ClinicConfig]] = None
+    # Expected attendees a slot is planned for; overbooking fills up to this
+    slot_capacity: float = Field(1.0, gt=0)
+    max_bookings_per_slot: int = Field(2, ge=1)
+    limit: Optional[int] = Field(None, gt=0)
+
+class ScheduleResult(BaseModel):
+    scheduled: int
+    unscheduled: int
+    # Slots this run booked into that hold more than one patient (including earlier runs' bookings)
+    overbooked_slots: int
+    expected_attendance: float
+    appointments_per_day: Dict[str, int]
+
+class ClinicianLoad(BaseModel):
+    clinic: str
+    clinician: str
+    appointments: int
+    slots_used: int
+    overbooked_slots: int
+    expected_attendance: float
+
+class DayLoad(BaseModel):
+    day: date
+    appointments: int
+    expected_attendance: float
+    clinicians: List[ClinicianLoad]
+
+class SimulatedAppointment(BaseModel):
+    arrival_minute: float = Field(..., ge=0)  # scheduled arrival, minutes after the session opens
+    no_show_probability: float = Field(..., ge=0, le=1)
+
+class SimulationScenario(BaseModel):
+    name: str
+    # Each defaults to the request's baseline
+    clinicians: Optional[int] = Field(None, ge=1, le=50)
+    # Share of every patient's no-show probability removed, e.g. by extra reminders
+    no_show_reduction: float = Field(0.0, ge=0, le=1)
+    service_minutes_mean: Optional[float] = Field(None, gt=0)
+
+class SimulationRequest(BaseModel):
+    # Either a booked clinic day from /schedule/run, or an explicit arrival schedule
+    day: Optional[date] = None
+    clinic: Optional[str] = None
+    appointments: Optional[List[SimulatedAppointment]] = Field(None, max_length=5000)
+    # Baseline; defaults to the clinicians booked that day (3 for an explicit schedule)
+    clinicians: Optional[int] = Field(None, ge=1, le=50)
+    service_minutes_mean: float = Field(25.0, gt=0)
+    service_minutes_cv: float = Field(0.5, ge=0)
+    # Standard deviation of arrival time around the scheduled minute (early or late)
+    arrival_sd_minutes: float = Field(10.0, ge=0)
+    # Defaults to the last scheduled arrival plus one mean service time
+    session_minutes: Optional[float] = Field(None, gt=0)
+    scenarios: List[SimulationScenario] = Field(default_factory=list, max_length=20)
+    replications: int = Field(2000, ge=1, le=100_000)
+    seed: int = 42
+
+class SimulationPercentiles(BaseModel):
+    mean: float
+    p50: float
+    p90: float
+    p95: float
+    p99: float
+
+class ScenarioResult(BaseModel):
+    name: str
+    clinicians: int
+    no_show_reduction: float
+    service_minutes_mean: float
+    mean_attended: float
+    waiting_minutes: SimulationPercentiles
+    # Patients already waiting when each attending patient arrives
+    queue_length: SimulationPercentiles
+    # Minutes the last consultation runs past session_minutes, per replication
+    overrun_minutes: SimulationPercentiles
+    clinician_utilization: float
+
+class SimulationResult(BaseModel):
+    appointments: int
+    replications: int
+    session_minutes: float
+    scenarios: List[ScenarioResult]
+
+class ReminderPlanRequest(BaseModel):
+    start_date: date
+    days: int = Field(7, gt=0, le=90)
+
+class ReminderPlanResult(BaseModel):
+    created: int
+    already_planned: int
+
+class ReminderStatus(BaseModel):
+    pending: int
+    sending: int
+    sent: int
+    failed: int
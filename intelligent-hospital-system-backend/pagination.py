@@ -0,0 +1,31 @@
+from sqlalchemy import select
+
+from database import Patient
+
+
+def patients_page(db, columns, skip=0, limit=100, cursor=None):
+    """One page of row tuples with the given columns (which must include Patient.id), in id order."""
+    query = select(*columns).order_by(Patient.id)
+    if cursor is not None:
+        # Keyset paging: seek straight to the next id instead of walking `skip` rows
+        query = query.where(Patient.id > cursor)
+    else:
+        query = query.offset(skip)
+    return db.execute(query.limit(limit)).all()
+
+
+def next_page_headers(request, cursor):
+    """X-Next-Cursor and a rel="next" Link for `cursor`, for every cursor-paged listing."""
+    # Keeps every other parameter (limit, fields, format, filters) on the next page
+    next_url = request.url.include_query_params(cursor=cursor)
+    return {
+        "X-Next-Cursor": str(cursor),
+        "Link": f'<{next_url.path}?{next_url.query}>; rel="next"',
+    }
+
+
+def next_cursor_headers(request, patients, limit):
+    # A full page means there may be more; clients pass this back as ?cursor=
+    if limit > 0 and len(patients) == limit:
+        return next_page_headers(request, patients[-1].id)
+    return {}
@@ -0,0 +1,255 @@
+import argparse
+import logging
+import multiprocessing
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+import metrics
+from feature_store import FEATURE_SCHEMA
+from model_registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+# Not enough signal to fit a forest below this many patients
+MIN_TRAINING_ROWS = 10
+
+
+def fit_model(X):
+    """Fit a fresh forest on a FEATURE_SCHEMA matrix. Runs inside the training worker process."""
+    if len(X) < MIN_TRAINING_ROWS:
+        return None, len(X), None
+
+    # Imported here: scikit-learn takes most of a second to import and only training needs it
+    from sklearn.ensemble import RandomForestClassifier
+
+    # Synthetic targets based on your research insights
+    y = np.random.randint(0, 2, len(X))
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    started = time.perf_counter()
+    model.fit(X, y)
+    return model, len(X), time.perf_counter() - started
+
+
+def train_and_publish(X, model_dir, keep_versions):
+    """Fit on the given features and publish the artifact. Runs inside the training worker process."""
+    model, rows, fit_seconds = fit_model(X)
+    if model is None:
+        return None
+    return ModelRegistry(model_dir, keep_versions).publish(
+        model, training_rows=rows, feature_schema=FEATURE_SCHEMA, fit_seconds=fit_seconds
+    )
+
+
+# Everything a request needs to know about the served model, swapped as one object
+ModelSnapshot = namedtuple("ModelSnapshot", ["compiled", "version", "trained_at", "training_rows"])
+
+
+# ML Model (Simplified for demo)
+class NoShowPredictor:
+    def __init__(self):
+        self._snapshot = ModelSnapshot(compiled=None, version=0, trained_at=None, training_rows=0)
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def compiled(self):
+        return self._snapshot.compiled
+
+    @property
+    def is_trained(self):
+        return self._snapshot.compiled is not None
+
+    def install(self, compiled, metadata):
+        # A single attribute assignment, so readers see either the old or the new model
+        self._snapshot = ModelSnapshot(
+            # Served as a CompiledForest, so requests never pay sklearn's per-call overhead
+            compiled=compiled,
+            version=metadata["version"],
+            trained_at=datetime.fromisoformat(metadata["trained_at"]),
+            training_rows=metadata["training_rows"],
+        )
+        metrics.model_version.set(metadata["version"])
+        metrics.model_training_rows.set(metadata["training_rows"])
+        if metadata.get("fit_seconds") is not None:
+            metrics.model_fit_seconds.set(metadata["fit_seconds"])
+
+    def load_latest(self, registry):
+        """Install the registry's current version if it differs from ours; returns True if it changed."""
+        version = registry.latest_version()
+        if version is None or version == self._snapshot.version:
+            return False
+        compiled, metadata = registry.load(version)
+        self.install(compiled, metadata)
+        return True
+
+
+class RetrainScheduler:
+    """Debounced background retraining for a NoShowPredictor.
+
+    Inserts call notify(), which only bumps a counter. A scheduler thread
+    waits until min_new_rows rows have arrived or max_delay seconds have
+    passed since the first of them, then fits the model in a worker process
+    on a copy of the FeatureStore's columns; the worker publishes it to the
+    shared ModelRegistry. Between runs the thread
+    polls the registry's version marker, so every API worker serves the
+    newest model no matter which worker trained it.
+    """
+
+    def __init__(self, predictor, feature_store, registry, min_new_rows, max_delay, poll_interval):
+        self.predictor = predictor
+        self.feature_store = feature_store
+        self.registry = registry
+        self.min_new_rows = max(1, min_new_rows)
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.training = False
+        self.last_error = None
+        self._pending = 0
+        self._first_pending_at = None
+        self._forced = False
+        self._stopping = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+
+    @property
+    def pending_rows(self):
+        return self._pending
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        # spawn, not fork: the API process holds open database connections and threads
+        self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self._thread = threading.Thread(target=self._run, name="retrain-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._thread = None
+        self._executor = None
+
+    def notify(self, new_rows=1):
+        with self._cond:
+            if self._pending == 0:
+                # Wake the scheduler so it starts the max_delay countdown
+                self._first_pending_at = time.monotonic()
+                self._cond.notify()
+            self._pending += new_rows
+            if self._pending >= self.min_new_rows:
+                self._cond.notify()
+
+    def request(self):
+        """Retrain as soon as the worker is free, regardless of pending rows."""
+        with self._cond:
+            self._forced = True
+            self._cond.notify()
+
+    def _wait_timeout(self):
+        # Caller holds the lock; None means there is nothing to wait for
+        if self._forced or self._pending >= self.min_new_rows:
+            return 0
+        if self._pending == 0:
+            return None
+        return max(0.0, self._first_pending_at + self.max_delay - time.monotonic())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                timeout = self._wait_timeout()
+                if not self._stopping and timeout != 0:
+                    self._cond.wait(self.poll_interval if timeout is None else min(timeout, self.poll_interval))
+                    timeout = self._wait_timeout()
+                if self._stopping:
+                    return
+                due_rows = None
+                if timeout == 0:
+                    # Rows inserted while training count towards the next run
+                    due_rows = self._pending
+                    self._pending = 0
+                    self._first_pending_at = None
+                    self._forced = False
+            self._sync()
+            if due_rows is not None:
+                self._retrain(due_rows)
+
+    def _sync(self):
+        try:
+            if self.predictor.load_latest(self.registry):
+                logger.info("Loaded model v%d from the registry", self.predictor.snapshot.version)
+        except Exception:
+            logger.exception("Could not load the latest model from the registry")
+
+    def _requeue(self, rows):
+        with self._cond:
+            if self._pending == 0:
+                self._first_pending_at = time.monotonic()
+            self._pending += rows
+
+    def _retrain(self, due_rows):
+        with self.registry.training_lock() as acquired:
+            if not acquired:
+                # Another worker is training; pick up its model and retry later if needed
+                self._requeue(due_rows)
+                return
+            self.training = True
+            started = time.monotonic()
+            try:
+                self.feature_store.refresh()
+                version = self._executor.submit(
+                    train_and_publish, self.feature_store.training_matrix(), self.registry.root,
+                    self.registry.keep_versions,
+                ).result()
+            except Exception as exc:
+                metrics.model_training_duration.observe(time.monotonic() - started, "failed")
+                self.last_error = str(exc)
+                logger.exception("Model retraining failed")
+                return
+            finally:
+                self.training = False
+        metrics.model_training_duration.observe(
+            time.monotonic() - started, "skipped" if version is None else "published"
+        )
+        self.last_error = None
+        if version is None:
+            return
+        self._sync()
+        logger.info("Published model v%d in %.2fs", version, time.monotonic() - started)
+
+
+def main():
+    """Fit on the current table and publish, e.g. at build time so a fresh deploy serves a model at once."""
+    parser = argparse.ArgumentParser(description="Train the no-show model and publish it to the registry")
+    parser.parse_args()
+
+    import config
+    from database import data_version, engine, init_db
+    from feature_store import FeatureStore
+
+    init_db()
+    store = FeatureStore(engine, data_version)
+    store.refresh()
+    started = time.perf_counter()
+    version = train_and_publish(store.training_matrix(), config.MODEL_DIR, config.MODEL_KEEP_VERSIONS)
+    if version is None:
+        print(f"Not enough patients to train ({len(store)} < {MIN_TRAINING_ROWS})")
+    else:
+        print(f"Published model v{version} from {len(store)} patients in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Opt-in sampling profiler for individual requests on a live server.
+
+With PROFILING_ENABLED=1, a request carrying `X-Profile: 1` is sampled while
+it runs: a background thread records the stack of every thread each
+interval. Sync routes run in the threadpool rather than on the event loop,
+so sampling all threads is what catches their work. Stacks are written in
+the folded format read by flamegraph.pl and speedscope; the response names
+the file in an X-Profile-File header. Only one request is profiled at a
+time, so other requests on a busy box show up as background noise.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_HEADER = b"x-profile"
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                thread_name = names.get(thread_id) or f"thread-{thread_id}"
+                self.samples[";".join([thread_name] + stack[::-1])] += 1
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that samples requests sent with the X-Profile header."""
+
+    def __init__(self, app, directory, interval):
+        self.app = app
+        self.directory = directory
+        self.interval = interval
+        self._busy = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or dict(scope["headers"]).get(PROFILE_HEADER) != b"1":
+            await self.app(scope, receive, send)
+            return
+        if not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['method']}-{slug}-{os.getpid()}.folded"
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-profile-file", filename.encode())
+                ]}
+            await send(message)
+
+        try:
+            with StackSampler(self.interval) as sampler:
+                await self.app(scope, receive, send_with_header)
+            sampler.write(os.path.join(self.directory, filename))
+        finally:
+            self._busy.release()
@@ -0,0 +1,66 @@
+import asyncio
+import importlib
+import logging
+import random
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+ReminderMessage = namedtuple("ReminderMessage", ["patient_id", "channel", "body", "idempotency_key"])
+
+
+class GatewayError(Exception):
+    """A send that may succeed if retried (timeouts, throttling, provider outages)."""
+
+
+class PermanentGatewayError(GatewayError):
+    """A send that will never succeed (unknown recipient, rejected content); not retried."""
+
+
+class ReminderGateway:
+    """Interface for SMS/voice providers.
+
+    send() delivers one message and returns the provider's message id. It
+    receives the job's idempotency key, which real providers should forward
+    so a send retried after a lost response is not delivered twice.
+    """
+
+    async def send(self, message):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class StubGateway(ReminderGateway):
+    """Records messages in memory instead of sending them; for local runs and tests.
+
+    latency and failure_rate simulate a provider, and a repeated idempotency
+    key returns the original message id as a real provider would.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = {}
+        self._random = random.Random(seed)
+
+    async def send(self, message):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if message.idempotency_key in self.sent:
+            return self.sent[message.idempotency_key][0]
+        if self._random.random() < self.failure_rate:
+            raise GatewayError("simulated provider failure")
+        provider_id = f"stub-{len(self.sent) + 1}"
+        self.sent[message.idempotency_key] = (provider_id, message)
+        logger.debug("Stub %s to patient %s: %s", message.channel, message.patient_id, message.body)
+        return provider_id
+
+
+def load_gateway(spec):
+    """Return the "stub" gateway or a "package.module:ClassName" ReminderGateway taking no arguments."""
+    if spec == "stub":
+        return StubGateway()
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
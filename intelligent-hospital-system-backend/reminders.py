@@ -0,0 +1,276 @@
+"""Reminder jobs: planning from appointments, and the asyncio dispatcher that sends them.
+
+Run the dispatcher as its own process so sends never compete with API
+requests:
+
+    python reminders.py --concurrency 50 --rate 200
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import config
+import metrics
+from database import Appointment, ReminderJob, init_db
+from reminder_gateways import PermanentGatewayError, ReminderMessage, load_gateway
+from scoring import REMINDER_PLAN, risk_level
+
+logger = logging.getLogger(__name__)
+
+PLAN_CHUNK_SIZE = 5000
+REMINDER_STATUSES = ["pending", "sending", "sent", "failed"]
+MESSAGES = {
+    "sms": "Reminder: you have an appointment at {clinic} on {day} at {time}. Reply YES to confirm or NO to reschedule.",
+    "call": "Call to confirm the appointment at {clinic} on {day} at {time}.",
+}
+
+reminders_sent = metrics.Counter(
+    "reminders_total", "Reminder send attempts by channel and outcome (sent, retry, failed)", ("channel", "outcome"),
+)
+
+
+def _timestamp(moment):
+    return moment.isoformat(timespec="seconds")
+
+
+def plan_reminders(db, start_date, days):
+    """Create reminder jobs for appointments in [start_date, start_date + days), per REMINDER_PLAN.
+
+    Idempotency keys make this safe to rerun: existing jobs are left alone.
+    Returns (created, already_planned).
+    """
+    end_date = start_date + timedelta(days=days)
+    now = datetime.now()
+    rows = db.execute(
+        select(Appointment.id, Appointment.patient_id, Appointment.clinic, Appointment.starts_at,
+               Appointment.no_show_probability)
+        .where(Appointment.day >= start_date.isoformat(), Appointment.day < end_date.isoformat())
+        .where(Appointment.starts_at > _timestamp(now))
+    ).all()
+
+    jobs = []
+    for appointment_id, patient_id, clinic, starts_at, probability in rows:
+        appointment_time = datetime.fromisoformat(starts_at)
+        for channel, days_before in REMINDER_PLAN[risk_level(probability)]:
+            # Reminders whose lead time has already passed go out straight away
+            send_at = _timestamp(max(now, appointment_time - timedelta(days=days_before)))
+            jobs.append({
+                "patient_id": patient_id,
+                "appointment_id": appointment_id,
+                "channel": channel,
+                "message": MESSAGES[channel].format(
+                    clinic=clinic, day=appointment_time.date().isoformat(), time=f"{appointment_time:%H:%M}"
+                ),
+                "idempotency_key": f"appointment-{appointment_id}-{channel}-{days_before}d",
+                "send_at": send_at,
+                "next_attempt_at": send_at,
+                "status": "pending",
+                "attempts": 0,
+            })
+
+    created = 0
+    statement = sqlite_insert(ReminderJob).on_conflict_do_nothing(index_elements=["idempotency_key"])
+    # Core execution on the session's connection, so rowcount reports only the rows actually inserted
+    connection = db.connection()
+    for start in range(0, len(jobs), PLAN_CHUNK_SIZE):
+        created += connection.execute(statement, jobs[start:start + PLAN_CHUNK_SIZE]).rowcount
+    db.commit()
+    return created, len(jobs) - created
+
+
+def reminder_status_counts(db):
+    counts = dict(db.execute(select(ReminderJob.status, func.count()).group_by(ReminderJob.status)).all())
+    return {status: counts.get(status, 0) for status in REMINDER_STATUSES}
+
+
+def claim_due_jobs(db, now, lease_until, batch_size):
+    """Mark up to batch_size due jobs as sending and return them.
+
+    The UPDATE re-checks status and due time, so when several dispatchers
+    race for the same rows each job is claimed exactly once. The claim
+    lapses at lease_until if its dispatcher dies mid-batch.
+    """
+    due = (ReminderJob.status.in_(("pending", "sending")), ReminderJob.next_attempt_at <= now)
+    ids = db.scalars(
+        select(ReminderJob.id).where(*due).order_by(ReminderJob.next_attempt_at).limit(batch_size)
+    ).all()
+    if not ids:
+        return []
+    claimed = db.execute(
+        update(ReminderJob)
+        .where(ReminderJob.id.in_(ids), *due)
+        .values(status="sending", next_attempt_at=lease_until, attempts=ReminderJob.attempts + 1)
+        .returning(ReminderJob.id, ReminderJob.patient_id, ReminderJob.channel, ReminderJob.message,
+                   ReminderJob.idempotency_key, ReminderJob.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return claimed
+
+
+def record_results(db, results):
+    # Every parameter set carries the same keys, so this runs as one executemany UPDATE
+    if results:
+        db.execute(update(ReminderJob), results)
+        db.commit()
+
+
+class TokenBucket:
+    """Async rate limiter: at most `rate` acquisitions per second, bursting up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ReminderDispatcher:
+    """Claims due reminder jobs in batches and sends them through a gateway.
+
+    Sends within a batch run concurrently, bounded by `concurrency` and the
+    token-bucket `rate`. Transient failures are retried with exponential
+    backoff and jitter until max_attempts; results for a batch are written
+    back in one transaction. Database work goes through AsyncSession.run_sync,
+    so the event loop is never blocked on SQLite.
+    """
+
+    def __init__(self, session_factory, gateway, batch_size=500, concurrency=50, rate_per_second=200.0,
+                 max_attempts=5, backoff_seconds=30.0, send_timeout=10.0, lease_seconds=300.0, poll_seconds=5.0):
+        self.session_factory = session_factory
+        self.gateway = gateway
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.send_timeout = send_timeout
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._bucket = TokenBucket(rate_per_second)
+
+    def _backoff(self, attempts):
+        delay = self.backoff_seconds * 2 ** (attempts - 1)
+        return delay * random.uniform(0.5, 1.5)
+
+    async def _send(self, job):
+        job_id, patient_id, channel, body, idempotency_key, attempts = job
+        result = {"id": job_id, "status": "sent", "next_attempt_at": None, "last_error": None,
+                  "provider_message_id": None, "sent_at": None}
+        async with self._semaphore:
+            await self._bucket.acquire()
+            try:
+                message = ReminderMessage(patient_id, channel, body, idempotency_key)
+                result["provider_message_id"] = await asyncio.wait_for(self.gateway.send(message), self.send_timeout)
+                result["sent_at"] = _timestamp(datetime.now())
+                reminders_sent.inc(channel, "sent")
+                return result
+            except Exception as exc:
+                error = f"{exc.__class__.__name__}: {exc}"
+                permanent = isinstance(exc, PermanentGatewayError)
+        result["last_error"] = error
+        if permanent or attempts >= self.max_attempts:
+            result["status"] = "failed"
+            reminders_sent.inc(channel, "failed")
+        else:
+            result["status"] = "pending"
+            result["next_attempt_at"] = _timestamp(datetime.now() + timedelta(seconds=self._backoff(attempts)))
+            reminders_sent.inc(channel, "retry")
+        return result
+
+    async def run_once(self):
+        """Send one batch; returns how many jobs it claimed."""
+        now = datetime.now()
+        async with self.session_factory() as db:
+            jobs = await db.run_sync(
+                claim_due_jobs, _timestamp(now), _timestamp(now + timedelta(seconds=self.lease_seconds)),
+                self.batch_size,
+            )
+        if not jobs:
+            return 0
+        results = await asyncio.gather(*(self._send(job) for job in jobs))
+        for result in results:
+            # Finished jobs keep the claim time out of the due index; retries get their backoff time
+            if result["next_attempt_at"] is None:
+                result["next_attempt_at"] = result["sent_at"] or _timestamp(now)
+        async with self.session_factory() as db:
+            await db.run_sync(record_results, results)
+        return len(jobs)
+
+    async def run(self, stop_event):
+        while not stop_event.is_set():
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Reminder batch failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                # Caught up: wait for new jobs to come due
+                try:
+                    await asyncio.wait_for(stop_event.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+
+def create_dispatcher(gateway=None, **overrides):
+    from async_database import AsyncSessionLocal
+
+    options = {
+        "batch_size": config.REMINDER_BATCH_SIZE,
+        "concurrency": config.REMINDER_CONCURRENCY,
+        "rate_per_second": config.REMINDER_RATE_PER_SECOND,
+        "max_attempts": config.REMINDER_MAX_ATTEMPTS,
+        "backoff_seconds": config.REMINDER_BACKOFF_SECONDS,
+        "send_timeout": config.REMINDER_SEND_TIMEOUT_SECONDS,
+        "lease_seconds": config.REMINDER_LEASE_SECONDS,
+        "poll_seconds": config.REMINDER_POLL_SECONDS,
+        **overrides,
+    }
+    return ReminderDispatcher(AsyncSessionLocal, gateway or load_gateway(config.REMINDER_GATEWAY), **options)
+
+
+async def _dispatch_forever(dispatcher):
+    stop_event = asyncio.Event()
+    try:
+        await dispatcher.run(stop_event)
+    finally:
+        await dispatcher.gateway.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send due reminder jobs")
+    parser.add_argument("--concurrency", type=int, default=config.REMINDER_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=config.REMINDER_RATE_PER_SECOND, help="sends per second")
+    parser.add_argument("--batch-size", type=int, default=config.REMINDER_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    dispatcher = create_dispatcher(
+        concurrency=args.concurrency, rate_per_second=args.rate, batch_size=args.batch_size,
+    )
+    try:
+        asyncio.run(_dispatch_forever(dispatcher))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
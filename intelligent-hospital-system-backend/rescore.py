@@ -0,0 +1,62 @@
+"""Recompute the stored no_show_probability for every patient.
+
+Run after changing RISK_RULES in scoring.py:
+
+    python rescore.py --chunk-size 5000
+"""
+import argparse
+import time
+
+from sqlalchemy import select, update
+
+from analytics import rebuild_rollups
+from database import Patient, SessionLocal, data_version, init_db
+from scoring import RISK_FIELDS, no_show_probabilities
+
+
+def rescore_patients(session_factory=SessionLocal, chunk_size=5000):
+    """Walk the patients table in id order and write back fresh scores, one bulk UPDATE per chunk."""
+    rescored = 0
+    last_id = 0
+    with session_factory() as db:
+        while True:
+            # Keyset paging on id keeps every chunk an index range scan
+            rows = db.execute(
+                select(Patient.id, *[getattr(Patient, field) for field in RISK_FIELDS])
+                .where(Patient.id > last_id)
+                .order_by(Patient.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            ids, *feature_columns = zip(*rows)
+            probabilities = no_show_probabilities(dict(zip(RISK_FIELDS, feature_columns)))
+            # A list of primary-keyed parameter sets runs as a single executemany UPDATE
+            db.execute(update(Patient), [
+                {"id": patient_id, "no_show_probability": probability}
+                for patient_id, probability in zip(ids, probabilities.tolist())
+            ])
+            db.commit()
+            rescored += len(rows)
+            last_id = ids[-1]
+
+        # High-risk counts depend on the scores we just rewrote
+        rebuild_rollups(db)
+    # Existing rows changed in place, so API workers reload their feature stores
+    data_version.new_epoch()
+    return rescored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore every patient's no-show probability")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="rows read and updated per transaction")
+    args = parser.parse_args()
+
+    init_db()
+    started = time.perf_counter()
+    rescored = rescore_patients(chunk_size=args.chunk_size)
+    print(f"Rescored {rescored} patients in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import heapq
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, distinct, func, insert, or_, select, update
+
+from database import Appointment, Patient, ReminderJob
+from models import ClinicConfig
+
+WRITE_CHUNK_SIZE = 5000
+
+
+def clinic_days(start_date, days, include_weekends):
+    result = []
+    day = start_date
+    while len(result) < days:
+        if include_weekends or day.weekday() < 5:
+            result.append(day)
+        day += timedelta(days=1)
+    return result
+
+
+def default_clinics(db):
+    # One clinic per location patients actually come from
+    locations = db.scalars(select(distinct(Patient.location)).where(Patient.location.is_not(None))).all()
+    return [ClinicConfig(name=location) for location in sorted(locations)]
+
+
+class SlotBook:
+    """The slots of one clinic as min-heaps ordered by start time, then clinician.
+
+    Every slot tracks its booking count and expected attendance (the sum of
+    1 - no_show_probability over its patients). book_empty hands out slots
+    nobody holds yet; book shares a slot. Patients share in order of rising
+    expected attendance, so a slot too full for one patient is too full for
+    everyone after it and can be dropped from the heap for good.
+    """
+
+    def __init__(self, clinic, days, slot_capacity, max_bookings):
+        self.clinic = clinic
+        self.slot_capacity = slot_capacity
+        self.max_bookings = max_bookings
+        self.slots = []  # (starts_at, day, clinician)
+        self.bookings = []
+        self.load = []
+        self._index = {}
+        self._heap = []
+        day_start = datetime.strptime(clinic.day_start, "%H:%M")
+        for day_number, day in enumerate(days):
+            for slot_number in range(clinic.slots_per_day):
+                start = day_start + timedelta(minutes=slot_number * clinic.slot_minutes)
+                starts_at = f"{day.isoformat()}T{start:%H:%M}"
+                for clinician_number, clinician in enumerate(clinic.clinicians):
+                    slot_id = len(self.slots)
+                    self.slots.append((starts_at, day.isoformat(), clinician))
+                    self.bookings.append(0)
+                    self.load.append(0.0)
+                    self._index[(starts_at, clinician)] = slot_id
+                    self._heap.append((day_number, slot_number, clinician_number, slot_id))
+        heapq.heapify(self._heap)
+        # Slots preloaded with bookings are skipped when popped
+        self._empty = list(self._heap)
+
+    def preload(self, starts_at, clinician, bookings, load):
+        """Account for appointments booked by earlier runs."""
+        slot_id = self._index.get((starts_at, clinician))
+        if slot_id is not None:
+            self.bookings[slot_id] += bookings
+            self.load[slot_id] += load
+
+    def _fits(self, slot_id, attendance):
+        # A slot always takes one patient; beyond that, only while expected attendance stays within capacity
+        if self.bookings[slot_id] == 0:
+            return True
+        return (self.bookings[slot_id] < self.max_bookings
+                and self.load[slot_id] + attendance <= self.slot_capacity + 1e-9)
+
+    def empty_slots(self):
+        return self.bookings.count(0)
+
+    def book_empty(self, attendance):
+        """Earliest slot nobody is booked into; None when every slot is taken."""
+        while self._empty:
+            slot_id = heapq.heappop(self._empty)[3]
+            if self.bookings[slot_id] == 0:
+                self.bookings[slot_id] = 1
+                self.load[slot_id] = attendance
+                return slot_id
+        return None
+
+    def book(self, attendance):
+        """Earliest slot that can take a patient with this expected attendance; None when the clinic is full."""
+        while self._heap:
+            slot_id = self._heap[0][3]
+            if self._fits(slot_id, attendance):
+                self.bookings[slot_id] += 1
+                self.load[slot_id] += attendance
+                return slot_id
+            heapq.heappop(self._heap)
+        return None
+
+
+def plan_schedule(patients, slot_books):
+    """Assign (id, location, no_show_probability) tuples to slots; returns [(patient_id, clinic, slot_id, p)].
+
+    Every empty slot in the window is filled before any slot is shared, so
+    a clinic with room spreads its patients over the days. Only the patients
+    beyond its empty slots overbook: the highest-risk ones, into the
+    earliest slots, which hold the highest-risk of the rest. Within each
+    pass riskier patients come first and get the shorter lead times.
+    """
+    waiting = defaultdict(list)
+    for patient in sorted(patients, key=lambda patient: -patient[2]):
+        if patient[1] in slot_books:
+            waiting[patient[1]].append(patient)
+
+    assignments = []
+    for location, clinic_patients in waiting.items():
+        book = slot_books[location]
+        surplus = max(0, len(clinic_patients) - book.empty_slots())
+        for patient_id, _, probability in clinic_patients[surplus:]:
+            slot_id = book.book_empty(1.0 - probability)
+            assignments.append((patient_id, location, slot_id, probability))
+        for patient_id, _, probability in clinic_patients[:surplus]:
+            slot_id = book.book(1.0 - probability)
+            if slot_id is not None:
+                assignments.append((patient_id, location, slot_id, probability))
+    return assignments
+
+
+def cancel_superseded_appointments(db, now):
+    """Delete future appointments that are no longer their patient's next_appointment, with their reminder jobs.
+
+    Returns the number of appointments cancelled. Does not commit.
+    """
+    superseded = (
+        select(Appointment.id)
+        .join(Patient, Patient.id == Appointment.patient_id)
+        .where(Appointment.starts_at > now)
+        .where(or_(Patient.next_appointment.is_(None), Patient.next_appointment != Appointment.starts_at))
+    )
+    ids = db.scalars(superseded).all()
+    for start in range(0, len(ids), WRITE_CHUNK_SIZE):
+        chunk = ids[start:start + WRITE_CHUNK_SIZE]
+        db.execute(delete(ReminderJob).where(ReminderJob.appointment_id.in_(chunk)))
+        db.execute(delete(Appointment).where(Appointment.id.in_(chunk)))
+    return len(ids)
+
+
+def run_schedule(db, request):
+    """Book every patient without an upcoming appointment into the request's clinic days.
+
+    A patient counts as booked while their next_appointment is still ahead
+    of the current time, wherever it falls relative to the window. Runs are
+    incremental: slots already booked in the window count towards capacity.
+    Patients whose previous appointment has passed move it to
+    last_appointment. Future appointments left behind by an earlier booking
+    are cancelled first, together with their reminder jobs.
+    """
+    # Same minute precision as Appointment.starts_at
+    now = datetime.now().isoformat(timespec="minutes")
+    cancel_superseded_appointments(db, now)
+
+    days = clinic_days(request.start_date, request.days, request.include_weekends)
+    clinics = request.clinics or default_clinics(db)
+    slot_books = {
+        clinic.name: SlotBook(clinic, days, request.slot_capacity, request.max_bookings_per_slot)
+        for clinic in clinics
+    }
+    existing = db.execute(
+        select(Appointment.clinic, Appointment.clinician, Appointment.starts_at,
+               func.count(), func.sum(Appointment.expected_attendance))
+        .where(Appointment.day.in_([day.isoformat() for day in days]), Appointment.clinic.in_(list(slot_books)))
+        .group_by(Appointment.clinic, Appointment.clinician, Appointment.starts_at)
+    ).all()
+    for clinic, clinician, starts_at, bookings, load in existing:
+        slot_books[clinic].preload(starts_at, clinician, bookings, load)
+
+    query = (
+        select(Patient.id, Patient.location, Patient.no_show_probability, Patient.next_appointment)
+        .where(Patient.location.in_(list(slot_books)))
+        .where(or_(Patient.next_appointment.is_(None), Patient.next_appointment <= now))
+        .order_by(Patient.id)
+    )
+    if request.limit:
+        query = query.limit(request.limit)
+    rows = db.execute(query).all()
+    previous = {patient_id: next_appointment for patient_id, _, _, next_appointment in rows}
+
+    assignments = plan_schedule([(row[0], row[1], row[2] or 0.0) for row in rows], slot_books)
+
+    appointment_rows, patient_updates = [], []
+    per_day = Counter()
+    for patient_id, clinic, slot_id, probability in assignments:
+        starts_at, day, clinician = slot_books[clinic].slots[slot_id]
+        appointment_rows.append({
+            "patient_id": patient_id,
+            "clinic": clinic,
+            "clinician": clinician,
+            "day": day,
+            "starts_at": starts_at,
+            "no_show_probability": probability,
+            "expected_attendance": 1.0 - probability,
+        })
+        update_values = {"id": patient_id, "next_appointment": starts_at}
+        # Only eligible once it has passed, so this never moves a future appointment
+        if previous[patient_id] is not None:
+            update_values["last_appointment"] = previous[patient_id]
+        patient_updates.append(update_values)
+        per_day[day] += 1
+
+    # One transaction; executemany in chunks keeps statements a manageable size
+    for start in range(0, len(appointment_rows), WRITE_CHUNK_SIZE):
+        db.execute(insert(Appointment), appointment_rows[start:start + WRITE_CHUNK_SIZE])
+    # Bulk UPDATE by primary key needs the same keys in every parameter set
+    with_last = [values for values in patient_updates if "last_appointment" in values]
+    without_last = [values for values in patient_updates if "last_appointment" not in values]
+    for updates in (with_last, without_last):
+        for start in range(0, len(updates), WRITE_CHUNK_SIZE):
+            db.execute(update(Patient), updates[start:start + WRITE_CHUNK_SIZE])
+    db.commit()
+
+    # Slots this run booked into that now hold more than one patient; earlier runs' slots are not counted
+    booked_slots = {(clinic, slot_id) for _, clinic, slot_id, _ in assignments}
+    overbooked = sum(1 for clinic, slot_id in booked_slots if slot_books[clinic].bookings[slot_id] > 1)
+    return {
+        "scheduled": len(assignments),
+        "unscheduled": len(rows) - len(assignments),
+        "overbooked_slots": overbooked,
+        "expected_attendance": sum(row["expected_attendance"] for row in appointment_rows),
+        "appointments_per_day": dict(sorted(per_day.items())),
+    }
+
+
+def day_load(db, day, clinic=None):
+    """Per-clinician bookings, slots used, overbooked slots and expected attendance for one day."""
+    per_slot = (
+        select(Appointment.clinic, Appointment.clinician, Appointment.starts_at,
+               func.count().label("bookings"),
+               func.sum(Appointment.expected_attendance).label("expected"))
+        .where(Appointment.day == day.isoformat())
+        .group_by(Appointment.clinic, Appointment.clinician, Appointment.starts_at)
+    )
+    if clinic is not None:
+        per_slot = per_slot.where(Appointment.clinic == clinic)
+    per_slot = per_slot.subquery()
+    rows = db.execute(
+        select(per_slot.c.clinic, per_slot.c.clinician,
+               func.sum(per_slot.c.bookings), func.count(),
+               func.sum(case((per_slot.c.bookings > 1, 1), else_=0)), func.sum(per_slot.c.expected))
+        .group_by(per_slot.c.clinic, per_slot.c.clinician)
+        .order_by(per_slot.c.clinic, per_slot.c.clinician)
+    ).all()
+    clinicians = [
+        {"clinic": clinic_name, "clinician": clinician, "appointments": appointments, "slots_used": slots_used,
+         "overbooked_slots": overbooked, "expected_attendance": expected}
+        for clinic_name, clinician, appointments, slots_used, overbooked, expected in rows
+    ]
+    return {
+        "day": day,
+        "appointments": sum(row["appointments"] for row in clinicians),
+        "expected_attendance": sum(row["expected_attendance"] for row in clinicians),
+        "clinicians": clinicians,
+    }
+
+
+def booked_arrivals(db, day, clinic):
+    """(minutes after the day's first slot, no_show_probability) of every booking, and the clinicians booked."""
+    rows = db.execute(
+        select(Appointment.starts_at, Appointment.clinician, Appointment.no_show_probability)
+        .where(Appointment.day == day.isoformat(), Appointment.clinic == clinic)
+        .order_by(Appointment.starts_at, Appointment.id)
+    ).all()
+    if not rows:
+        return [], [], 0
+    times = [datetime.fromisoformat(starts_at) for starts_at, _, _ in rows]
+    first = min(times)
+    minutes = [(moment - first).total_seconds() / 60 for moment in times]
+    return minutes, [probability for _, _, probability in rows], len({clinician for _, clinician, _ in rows})
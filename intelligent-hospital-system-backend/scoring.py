@@ -0,0 +1,125 @@
+from functools import lru_cache
+from itertools import product
+
+import numpy as np
+
+# One declarative spec for no-show risk, used at intake, by the prediction
+# endpoints and by rescore.py. Probability = base + every matching weight,
+# clamped to [min, max].
+RISK_RULES = {
+    "base": 0.3,  # Base risk from your findings
+    "min": 0.05,
+    "max": 0.95,
+    # field -> {category: weight}; unlisted categories add nothing
+    "categorical": {
+        "age_group": {"48+": 0.15},  # 48+ group represents 48% of respondents
+        "education": {"Primary": 0.10},  # Education affects health literacy
+    },
+    # (field, bound, weight): weight applies when field < bound
+    "below": [
+        ("accessibility_score", 70, 0.20),  # Below average from your 61.4% finding
+    ],
+}
+
+# Risk bands used by predictions, the dashboard and reminders
+HIGH_RISK_THRESHOLD = 0.7
+MEDIUM_RISK_THRESHOLD = 0.4
+
+RECOMMENDED_ACTIONS = {
+    "High": ["Send SMS reminder 3 days before", "Follow-up call 1 day before", "Consider rescheduling"],
+    "Medium": ["Send SMS reminder 2 days before", "Confirm attendance 1 day before"],
+    "Low": ["Standard SMS reminder 1 day before"],
+}
+
+# RECOMMENDED_ACTIONS as reminder jobs: (channel, days before the appointment)
+REMINDER_PLAN = {
+    "High": [("sms", 3), ("call", 1)],
+    "Medium": [("sms", 2), ("sms", 1)],
+    "Low": [("sms", 1)],
+}
+
+
+class CompiledRiskRules:
+    """RISK_RULES compiled into a dense lookup table.
+
+    Every rule maps its field to a small integer code: a category index for
+    categorical rules, 0/1 for threshold rules. The table holds the final
+    clamped probability for every combination of codes, so scoring is a code
+    lookup plus one table index, for a single patient or a whole column.
+    """
+
+    def __init__(self, rules):
+        self.categorical = [
+            (field, list(weights)) for field, weights in rules["categorical"].items()
+        ]
+        self.below = [(field, bound) for field, bound, _ in rules["below"]]
+        self.fields = tuple(
+            [field for field, _ in self.categorical] + [field for field, _ in self.below]
+        )
+
+        # Code 0 is "any other category"; listed categories start at 1
+        axes = [[0.0] + list(weights.values()) for weights in rules["categorical"].values()]
+        axes += [[0.0, weight] for _, _, weight in rules["below"]]
+        self.table = np.empty([len(axis) for axis in axes])
+        for codes in product(*[range(len(axis)) for axis in axes]):
+            risk = rules["base"]
+            for axis, code in zip(axes, codes):
+                risk += axis[code]
+            self.table[codes] = min(rules["max"], max(rules["min"], risk))
+
+    def score(self, *values):
+        """Probability for one patient; values follow self.fields."""
+        codes = []
+        for (field, categories), value in zip(self.categorical, values):
+            codes.append(categories.index(value) + 1 if value in categories else 0)
+        for (field, bound), value in zip(self.below, values[len(self.categorical):]):
+            codes.append(1 if value < bound else 0)
+        return float(self.table[tuple(codes)])
+
+    def score_columns(self, columns):
+        """Probabilities for equal-length sequences keyed by field name."""
+        if len(columns[self.fields[0]]) == 0:
+            return np.empty(0)
+        codes = []
+        for field, categories in self.categorical:
+            column = np.asarray(columns[field])
+            field_codes = np.zeros(len(column), dtype=np.intp)
+            for code, category in enumerate(categories, start=1):
+                field_codes[column == category] = code
+            codes.append(field_codes)
+        for field, bound in self.below:
+            codes.append((np.asarray(columns[field], dtype=float) < bound).astype(np.intp))
+        return self.table[tuple(codes)]
+
+
+RISK_MODEL = CompiledRiskRules(RISK_RULES)
+RISK_FIELDS = RISK_MODEL.fields
+
+
+@lru_cache(maxsize=65536)
+def _score_features(features):
+    return RISK_MODEL.score(*features)
+
+
+def no_show_probability(patient):
+    """Risk for one patient-like object, memoized on its rule inputs."""
+    return _score_features(tuple(getattr(patient, field) for field in RISK_FIELDS))
+
+
+def no_show_probabilities(columns):
+    """Vectorized no_show_probability over columns keyed by field name."""
+    return RISK_MODEL.score_columns(columns)
+
+
+def risk_level(probability):
+    if probability > HIGH_RISK_THRESHOLD:
+        return "High"
+    if probability > MEDIUM_RISK_THRESHOLD:
+        return "Medium"
+    return "Low"
+
+
+def risk_levels(probabilities):
+    probabilities = np.asarray(probabilities)
+    return np.where(probabilities > HIGH_RISK_THRESHOLD, "High",
+                    np.where(probabilities > MEDIUM_RISK_THRESHOLD, "Medium", "Low"))
@@ -0,0 +1,165 @@
+import base64
+import json
+from typing import List, Optional
+
+from fastapi import HTTPException, Query
+from sqlalchemy import func, select, tuple_
+
+from database import Patient
+from pagination import next_page_headers
+
+MAX_SEARCH_LIMIT = 1000
+
+CATEGORICAL_FILTERS = ["age_group", "gender", "education", "location"]
+SCORE_FIELDS = [
+    "physical_env_score",
+    "technical_quality_score",
+    "interpersonal_score",
+    "communication_score",
+    "accessibility_score",
+]
+SORT_FIELDS = ["id", "no_show_probability", *CATEGORICAL_FILTERS, *SCORE_FIELDS]
+
+
+class PatientSearchParams:
+    """Query parameters for GET /patients/search; categorical filters may repeat (?location=A&location=B)."""
+
+    def __init__(
+        self,
+        age_group: Optional[List[str]] = Query(None),
+        gender: Optional[List[str]] = Query(None),
+        education: Optional[List[str]] = Query(None),
+        location: Optional[List[str]] = Query(None),
+        min_probability: Optional[float] = None,
+        max_probability: Optional[float] = None,
+        min_physical_env_score: Optional[float] = None,
+        max_physical_env_score: Optional[float] = None,
+        min_technical_quality_score: Optional[float] = None,
+        max_technical_quality_score: Optional[float] = None,
+        min_interpersonal_score: Optional[float] = None,
+        max_interpersonal_score: Optional[float] = None,
+        min_communication_score: Optional[float] = None,
+        max_communication_score: Optional[float] = None,
+        min_accessibility_score: Optional[float] = None,
+        max_accessibility_score: Optional[float] = None,
+        sort: str = "id",
+        order: str = "asc",
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        count: bool = False,
+    ):
+        if sort not in SORT_FIELDS:
+            raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_FIELDS)}")
+        if order not in ("asc", "desc"):
+            raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+        if not 0 <= limit <= MAX_SEARCH_LIMIT:
+            raise HTTPException(status_code=400, detail=f"limit must be between 0 and {MAX_SEARCH_LIMIT}")
+        self.categorical = {
+            field: values for field, values in
+            zip(CATEGORICAL_FILTERS, [age_group, gender, education, location]) if values
+        }
+        self.ranges = {
+            "no_show_probability": (min_probability, max_probability),
+            "physical_env_score": (min_physical_env_score, max_physical_env_score),
+            "technical_quality_score": (min_technical_quality_score, max_technical_quality_score),
+            "interpersonal_score": (min_interpersonal_score, max_interpersonal_score),
+            "communication_score": (min_communication_score, max_communication_score),
+            "accessibility_score": (min_accessibility_score, max_accessibility_score),
+        }
+        self.sort = sort
+        self.order = order
+        self.limit = limit
+        self.after = decode_cursor(cursor, sort, order) if cursor else None
+        self.count = count
+
+
+def encode_cursor(sort, order, value, patient_id):
+    raw = json.dumps([sort, order, value, patient_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort, order):
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    # [sort, order, sort value, id] as written by encode_cursor; anything else would fail at bind time
+    if not isinstance(decoded, list) or len(decoded) != 4:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    cursor_sort, cursor_order, value, patient_id = decoded
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise HTTPException(status_code=400, detail="cursor was issued for a different sort order")
+    if not _is_int(patient_id) or not _valid_sort_value(sort, value):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return value, patient_id
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _valid_sort_value(sort, value):
+    # The last row's sort value as encode_cursor wrote it; nullable columns may have been NULL
+    if sort == "id":
+        return _is_int(value)
+    if value is None:
+        return True
+    if sort in CATEGORICAL_FILTERS:
+        return isinstance(value, str)
+    return _is_int(value) or isinstance(value, float)
+
+
+def _conditions(params):
+    conditions = []
+    for field, values in params.categorical.items():
+        column = getattr(Patient, field)
+        conditions.append(column == values[0] if len(values) == 1 else column.in_(values))
+    for field, (low, high) in params.ranges.items():
+        column = getattr(Patient, field)
+        if low is not None:
+            conditions.append(column >= low)
+        if high is not None:
+            conditions.append(column <= high)
+    return conditions
+
+
+def search_patients(db, params, columns):
+    """One page of matching patients (row tuples of `columns`) plus, if asked, the total match count.
+
+    Pages are keyset-paged on (sort column, id), so every page is an index
+    seek however deep the client has paged; `columns` must include both. The count is a COUNT(*) over the
+    same filters and never loads rows.
+    """
+    conditions = _conditions(params)
+    total = db.scalar(select(func.count()).select_from(Patient).where(*conditions)) if params.count else None
+    if params.limit == 0:
+        return [], total
+
+    sort_column = getattr(Patient, params.sort)
+    descending = params.order == "desc"
+    query = select(*columns).where(*conditions)
+    if params.after is not None:
+        value, patient_id = params.after
+        if params.sort == "id":
+            query = query.where(Patient.id < patient_id if descending else Patient.id > patient_id)
+        else:
+            key = tuple_(sort_column, Patient.id)
+            query = query.where(key < tuple_(value, patient_id) if descending else key > tuple_(value, patient_id))
+    order_by = [sort_column.desc(), Patient.id.desc()] if descending else [sort_column, Patient.id]
+    if params.sort == "id":
+        order_by = order_by[:1]
+    patients = db.execute(query.order_by(*order_by).limit(params.limit)).all()
+    return patients, total
+
+
+def search_headers(request, params, patients, total):
+    headers = {}
+    if total is not None:
+        headers["X-Total-Count"] = str(total)
+    # A full page means there may be more; clients pass this back as ?cursor=
+    if params.limit > 0 and len(patients) == params.limit:
+        last = patients[-1]
+        headers.update(next_page_headers(
+            request, encode_cursor(params.sort, params.order, getattr(last, params.sort), last.id)
+        ))
+    return headers
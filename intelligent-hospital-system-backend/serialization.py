@@ -0,0 +1,87 @@
+import json
+from typing import Optional
+
+from fastapi import HTTPException
+
+from database import Patient
+from models import Patient as PatientModel
+
+try:
+    import orjson
+except ImportError:  # the standard library encoder, several times slower on large pages
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # format=arrow is unavailable
+    pa = None
+
+# Response fields in the order PatientModel serializes them
+PATIENT_FIELDS = list(PatientModel.model_fields)
+PATIENT_COLUMNS = {name: getattr(Patient, name) for name in PATIENT_FIELDS}
+
+LISTING_MEDIA_TYPES = {
+    "json": "application/json",
+    "columnar": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def dumps(value):
+    """Compact JSON bytes, via orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+class ListingParams:
+    """?fields= projection and ?format= for patient listings.
+
+    json is the usual list of objects; columnar is one JSON array per field
+    ({"id": [...], "age_group": [...]}), and arrow an Arrow IPC stream,
+    both much smaller for large pages.
+    """
+
+    def __init__(self, fields: Optional[str] = None, format: str = "json"):
+        if format not in LISTING_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(LISTING_MEDIA_TYPES)}")
+        if format == "arrow" and pa is None:
+            raise HTTPException(status_code=501, detail="format=arrow needs pyarrow installed on the server")
+        self.format = format
+        self.fields = PATIENT_FIELDS
+        if fields:
+            self.fields = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+            unknown = [name for name in self.fields if name not in PATIENT_COLUMNS]
+            if unknown or not self.fields:
+                raise HTTPException(status_code=400,
+                                    detail=f"fields must be a comma-separated subset of {', '.join(PATIENT_FIELDS)}")
+
+    @property
+    def media_type(self):
+        return LISTING_MEDIA_TYPES[self.format]
+
+    def columns(self, *required):
+        """Columns to select: the requested fields, then any `required` ones (for cursors) not among them."""
+        names = self.fields + [name for name in required if name not in self.fields]
+        return [PATIENT_COLUMNS[name] for name in names]
+
+    def encode(self, rows):
+        """Serialize SQL rows whose first columns are self.fields; extra trailing columns are dropped."""
+        if self.format == "json":
+            # zip stops at the last requested field
+            return dumps([dict(zip(self.fields, row)) for row in rows])
+        values = list(zip(*rows))[:len(self.fields)] if rows else [()] * len(self.fields)
+        if self.format == "columnar":
+            return dumps({name: list(column) for name, column in zip(self.fields, values)})
+        table = pa.table({name: pa.array(column, type=_ARROW_TYPES[name]) for name, column in zip(self.fields, values)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+if pa is not None:
+    _ARROW_TYPES = {
+        name: {int: pa.int64(), float: pa.float64()}.get(column.type.python_type, pa.string())
+        for name, column in PATIENT_COLUMNS.items()
+    }
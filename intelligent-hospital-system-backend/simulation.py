@@ -0,0 +1,163 @@
+import multiprocessing
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Replications per task; every chunk has its own child seed, so results are the same for any worker count
+CHUNK_REPLICATIONS = 250
+PERCENTILES = [50, 90, 95, 99]
+
+# What-if settings for one run of the clinic day
+Scenario = namedtuple("Scenario", ["name", "clinicians", "no_show_reduction", "service_minutes_mean"])
+
+
+def _draw(seed_sequence, replications, patients):
+    # Shared by every scenario (common random numbers), so differences come from the scenario, not the noise
+    rng = np.random.default_rng(seed_sequence)
+    return (
+        rng.standard_normal((replications, patients)),  # arrival jitter
+        rng.random((replications, patients)),  # attends when above the no-show probability
+        rng.standard_normal((replications, patients)),  # service time, on the log scale
+    )
+
+
+def simulate_day(scheduled, probabilities, scenario, draws, arrival_sd, service_cv, session_minutes):
+    """One FCFS multi-clinician queue per replication, every replication advanced together.
+
+    Patients arrive at their scheduled minute plus normal jitter and attend
+    with probability 1 - no_show_probability * (1 - no_show_reduction).
+    Service times are lognormal with the scenario's mean and service_cv.
+    The event loop runs over patients in arrival order; each step is one
+    NumPy operation across all replications: the first free clinician
+    takes the patient, or the patient waits for one.
+
+    Returns (waits of attending patients, queue length each attending
+    patient found on arrival, per-replication attendance, overrun past
+    session_minutes and clinician utilisation).
+    """
+    jitter, attend_draw, service_draw = draws
+    replications, patients = jitter.shape
+    arrivals = np.maximum(scheduled + jitter * arrival_sd, 0.0)
+    order = np.argsort(arrivals, axis=1, kind="stable")
+    arrivals = np.take_along_axis(arrivals, order, axis=1)
+    attends = np.take_along_axis(
+        attend_draw >= probabilities * (1.0 - scenario.no_show_reduction), order, axis=1
+    )
+    sigma = np.sqrt(np.log1p(service_cv ** 2))
+    mu = np.log(scenario.service_minutes_mean) - sigma ** 2 / 2
+    services = np.where(attends, np.exp(mu + sigma * np.take_along_axis(service_draw, order, axis=1)), 0.0)
+
+    free_at = np.zeros((replications, scenario.clinicians))
+    rows = np.arange(replications)
+    # FCFS start times never decrease; no-shows repeat the previous start to keep them sorted
+    starts = np.empty((replications, patients))
+    last_start = np.zeros(replications)
+    for k in range(patients):
+        clinician = free_at.argmin(axis=1)
+        start = np.maximum(arrivals[:, k], free_at[rows, clinician])
+        attending = attends[:, k]
+        free_at[rows, clinician] = np.where(attending, start + services[:, k], free_at[rows, clinician])
+        last_start = np.where(attending, start, last_start)
+        starts[:, k] = last_start
+    waits = starts - arrivals
+
+    # Queue found on arrival: earlier attending patients whose start is still ahead. With sorted starts
+    # that is one searchsorted for every row at once, each row shifted past the previous one's values.
+    span = max(starts.max(), arrivals.max()) + 1.0
+    offsets = (rows * span)[:, None]
+    started = np.searchsorted((starts + offsets).ravel(), (arrivals + offsets).ravel(), side="right")
+    started = np.minimum(started.reshape(replications, patients) - rows[:, None] * patients, np.arange(patients))
+    attended_before = np.hstack([np.zeros((replications, 1), dtype=np.int64), np.cumsum(attends, axis=1)])
+    queue = attended_before[:, :-1] - np.take_along_axis(attended_before, started, axis=1)
+
+    finish = free_at.max(axis=1)
+    busy = services.sum(axis=1)
+    return (
+        waits[attends].astype(np.float32),
+        queue[attends],
+        attends.sum(axis=1),
+        np.maximum(finish - session_minutes, 0.0),
+        busy / (scenario.clinicians * np.maximum(finish, session_minutes)),
+    )
+
+
+def simulate_chunk(seed_sequence, replications, scheduled, probabilities, scenarios, arrival_sd, service_cv,
+                   session_minutes):
+    """Every scenario over one chunk of replications; runs in a worker process."""
+    draws = _draw(seed_sequence, replications, len(scheduled))
+    return [
+        simulate_day(scheduled, probabilities, scenario, draws, arrival_sd, service_cv, session_minutes)
+        for scenario in scenarios
+    ]
+
+
+def _percentiles(values):
+    if len(values) == 0:
+        return {"mean": 0.0, **{f"p{q}": 0.0 for q in PERCENTILES}}
+    points = np.percentile(values, PERCENTILES).tolist()
+    return {"mean": float(np.mean(values)), **{f"p{q}": value for q, value in zip(PERCENTILES, points)}}
+
+
+def summarize(scenario, results):
+    waits, queues, attended, overrun, utilization = (np.concatenate(parts) for parts in zip(*results))
+    return {
+        "name": scenario.name,
+        "clinicians": scenario.clinicians,
+        "no_show_reduction": scenario.no_show_reduction,
+        "service_minutes_mean": scenario.service_minutes_mean,
+        "mean_attended": float(attended.mean()),
+        "waiting_minutes": _percentiles(waits),
+        "queue_length": _percentiles(queues),
+        "overrun_minutes": _percentiles(overrun),
+        "clinician_utilization": float(utilization.mean()),
+    }
+
+
+class ClinicSimulator:
+    """Monte Carlo runs of a clinic day, with replications spread over a process pool.
+
+    Replications are split into fixed-size chunks, each seeded from the
+    request's seed, and every scenario is run on the same draws. Small runs
+    stay in the calling thread, where the pool's start-up and pickling would
+    cost more than they save. The pool is created on first use.
+    """
+
+    def __init__(self, workers, inline_work):
+        self.workers = max(1, workers)
+        self.inline_work = inline_work
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the API process holds open database connections and threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def stop(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def run(self, scheduled, probabilities, scenarios, replications, seed, arrival_sd, service_cv,
+            session_minutes):
+        """Summary per scenario: waiting time, queue length and overrun percentiles, attendance and utilisation."""
+        scheduled = np.asarray(scheduled, dtype=np.float64)
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        sizes = [min(CHUNK_REPLICATIONS, replications - start) for start in range(0, replications, CHUNK_REPLICATIONS)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        arguments = [
+            [scheduled] * len(sizes), [probabilities] * len(sizes), [scenarios] * len(sizes),
+            [arrival_sd] * len(sizes), [service_cv] * len(sizes), [session_minutes] * len(sizes),
+        ]
+        if self.workers == 1 or replications * len(scheduled) * len(scenarios) <= self.inline_work:
+            chunks = list(map(simulate_chunk, seeds, sizes, *arguments))
+        else:
+            chunks = list(self._pool().map(simulate_chunk, seeds, sizes, *arguments))
+        return [summarize(scenario, [chunk[index] for chunk in chunks]) for index, scenario in enumerate(scenarios)]
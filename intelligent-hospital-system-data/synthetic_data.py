@@ -1,47 +1,219 @@
-import requests
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 import random
 
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "intelligent-hospital-system-backend")
+
+# Demographics from your research
+age_groups = ["18-27", "28-37", "38-47", "48+"]
+age_weights = [0.09, 0.16, 0.26, 0.48]  # From your research
+
+genders = ["Male", "Female"]
+gender_weights = [0.27, 0.73]  # 73% female from your research
+
+education_levels = ["Primary", "Secondary", "University"]
+education_weights = [0.34, 0.48, 0.09]  # From your research
+
+income_levels = ["<11,000", "11,000-20,999", "21,000-30,999"]
+
+locations = ["Kiambu Town", "Limuru", "Kirigiti", "Thendigua", "Githiga", "Runda", "Other"]
+
+# Satisfaction scores based on your research averages with some variation (inclusive ranges)
+score_ranges = {
+    "physical_env_score": (55, 70),  # Around 61.8%
+    "technical_quality_score": (60, 75),  # Around 64.8%
+    "interpersonal_score": (75, 90),  # Around 81.9%
+    "communication_score": (55, 70),  # Around 62.0%
+    "accessibility_score": (55, 70),  # Around 61.4%
+}
+
 # Generate synthetic data based on your research findings
 def generate_synthetic_patients():
+    import requests  # only the API mode talks to a running backend
+
     base_url = "http://localhost:8000"
-    
-    # Demographics from your research
-    age_groups = ["18-27", "28-37", "38-47", "48+"]
-    age_weights = [0.09, 0.16, 0.26, 0.48]  # From your research
-    
-    genders = ["Male", "Female"] 
-    gender_weights = [0.27, 0.73]  # 73% female from your research
-    
-    education_levels = ["Primary", "Secondary", "University"]
-    education_weights = [0.34, 0.48, 0.09]  # From your research
-    
-    locations = ["Kiambu Town", "Limuru", "Kirigiti", "Thendigua", "Githiga", "Runda", "Other"]
-    
+
     # Generate 20 synthetic patients
+    patients = []
     for i in range(20):
         patient_data = {
             "age_group": random.choices(age_groups, weights=age_weights)[0],
             "gender": random.choices(genders, weights=gender_weights)[0],
             "education": random.choices(education_levels, weights=education_weights)[0],
-            "income_level": random.choice(["<11,000", "11,000-20,999", "21,000-30,999"]),
+            "income_level": random.choice(income_levels),
             "location": random.choice(locations),
-            # Satisfaction scores based on your research averages with some variation
-            "physical_env_score": random.randint(55, 70),  # Around 61.8%
-            "technical_quality_score": random.randint(60, 75),  # Around 64.8%
-            "interpersonal_score": random.randint(75, 90),  # Around 81.9%
-            "communication_score": random.randint(55, 70),  # Around 62.0%
-            "accessibility_score": random.randint(55, 70),  # Around 61.4%
         }
-        
+        for field, (low, high) in score_ranges.items():
+            patient_data[field] = random.randint(low, high)
+        patients.append(patient_data)
+
+    # One streamed NDJSON upload instead of a request per patient
+    body = "".join(json.dumps(patient) + "\n" for patient in patients)
+    try:
+        response = requests.post(
+            f"{base_url}/patients/bulk",
+            data=body.encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        if response.status_code == 200:
+            result = response.json()
+            print(f"Created {result['inserted']} patients")
+            for error in result["errors"]:
+                print(f"Failed to create patient {error['row']}: {'; '.join(error['errors'])}")
+        else:
+            print("Failed to create patients")
+    except requests.exceptions.ConnectionError:
+        print("Backend not running")
+
+def _weights(values):
+    # random.choices normalises its weights; numpy needs them to sum to 1
+    total = sum(values)
+    return [value / total for value in values]
+
+def generate_chunk(seed_sequence, size, history_days=0, until=None):
+    """Draw every column for `size` patients at once; same weights as generate_synthetic_patients.
+
+    created_at is spread uniformly over the `history_days` days up to `until`.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed_sequence)
+    columns = {
+        "age_group": rng.choice(age_groups, size=size, p=_weights(age_weights)),
+        "gender": rng.choice(genders, size=size, p=_weights(gender_weights)),
+        "education": rng.choice(education_levels, size=size, p=_weights(education_weights)),
+        "income_level": rng.choice(income_levels, size=size),
+        "location": rng.choice(locations, size=size),
+    }
+    for field, (low, high) in score_ranges.items():
+        columns[field] = rng.integers(low, high + 1, size=size).astype(float)
+    seconds_back = rng.integers(0, max(history_days * 86_400, 1), size=size)
+    columns["created_at"] = (np.datetime64(until, "s") - seconds_back).astype(str)
+    return columns
+
+def _chunk_sizes(rows, chunk_size):
+    return [min(chunk_size, rows - start) for start in range(0, rows, chunk_size)]
+
+def iter_chunks(rows, chunk_size, workers, seed, history_days=0):
+    """Yield column chunks in order; each chunk has its own child seed, so output is the same for any worker count."""
+    import numpy as np
+
+    sizes = _chunk_sizes(rows, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    # One reference time for every chunk, in clinic local time as the API stamps rows
+    until = [datetime.now().replace(microsecond=0)] * len(sizes)
+    history = [history_days] * len(sizes)
+    if workers <= 1:
+        yield from map(generate_chunk, seeds, sizes, history, until)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(generate_chunk, seeds, sizes, history, until)
+
+def _add_scores(columns, scoring):
+    columns["no_show_probability"] = scoring.no_show_probabilities(columns)
+    columns["preferred_contact"] = ["SMS"] * len(columns["age_group"])
+    return columns
+
+def write_database(chunks, scoring):
+    """Bulk insert straight into the backend's patients table, one transaction per chunk."""
+    from analytics import rebuild_rollups
+    from database import SessionLocal, data_version, engine, init_db
+
+    init_db()
+    written = 0
+    connection = engine.raw_connection()
+    try:
+        for columns in chunks:
+            columns = _add_scores(columns, scoring)
+            names = list(columns)
+            statement = f"INSERT INTO patients ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+            cursor = connection.cursor()
+            cursor.executemany(statement, zip(*[
+                column.tolist() if hasattr(column, "tolist") else column for column in columns.values()
+            ]))
+            cursor.close()
+            connection.commit()
+            written += len(columns["age_group"])
+    finally:
+        connection.close()
+        # Raw DBAPI writes bypass the session hooks; invalidate the API's cached reads ourselves
+        data_version.bump()
+
+    # Rows written behind the API's back: bring the dashboard and daily rollups in line
+    with SessionLocal() as db:
+        rebuild_rollups(db)
+    return written
+
+def write_file(chunks, path, scoring):
+    import pandas as pd
+
+    written = 0
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Parquet output needs pyarrow: pip install pyarrow")
+        writer = None
         try:
-            response = requests.post(f"{base_url}/patients/", json=patient_data)
-            if response.status_code == 200:
-                print(f"Created patient {i+1}")
-            else:
-                print(f"Failed to create patient {i+1}")
-        except:
-            print("Backend not running")
-            break
+            for columns in chunks:
+                table = pa.Table.from_pandas(pd.DataFrame(_add_scores(columns, scoring)), preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                written += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+    for index, columns in enumerate(chunks):
+        frame = pd.DataFrame(_add_scores(columns, scoring))
+        frame.to_csv(path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+        written += len(frame)
+    return written
+
+def generate_bulk(rows, chunk_size, workers, seed, output, database_url=None, history_days=0):
+    # Reuse the backend's schema, storage settings and risk rules
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+    import scoring
+
+    started = time.perf_counter()
+    chunks = iter_chunks(rows, chunk_size, workers, seed, history_days)
+    if output == "db":
+        written = write_database(chunks, scoring)
+    else:
+        written = write_file(chunks, output, scoring)
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {written} patients to {output} in {elapsed:.2f}s ({written / elapsed:,.0f} rows/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic patients based on the Kiambu research findings")
+    parser.add_argument("--mode", choices=["api", "bulk"], default="api",
+                        help="api: post 20 patients to a running backend; bulk: vectorized generation")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="bulk: number of patients")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="bulk: rows generated and written at a time")
+    parser.add_argument("--workers", type=int, default=1, help="bulk: processes generating chunks in parallel")
+    parser.add_argument("--seed", type=int, default=42, help="bulk: random seed")
+    parser.add_argument("--output", default="db",
+                        help="bulk: 'db' for the backend database, or a .csv/.parquet path")
+    parser.add_argument("--database-url", help="bulk: overrides the backend's DATABASE_URL")
+    parser.add_argument("--history-days", type=int, default=365,
+                        help="bulk: spread created_at over this many past days (0: all now)")
+    args = parser.parse_args()
+
+    if args.mode == "api":
+        generate_synthetic_patients()
+    else:
+        generate_bulk(args.rows, args.chunk_size, args.workers, args.seed, args.output, args.database_url,
+                      args.history_days)
 
 if __name__ == "__main__":
-    generate_synthetic_patients()
\ No newline at end of file
+    main()
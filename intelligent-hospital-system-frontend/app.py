@@ -4,6 +4,9 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import os
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Page config
 st.set_page_config(
@@ -12,8 +15,72 @@ st.set_page_config(
     layout="wide"
 )
 
-# Use your live Render backend URL
-API_BASE = "https://hospital-backend-kyay.onrender.com"
+def get_setting(name, default):
+    # Environment first, then .streamlit/secrets.toml, then the default
+    if os.getenv(name):
+        return os.getenv(name)
+    try:
+        return st.secrets.get(name, default)
+    except FileNotFoundError:
+        return default
+
+# Defaults to the live Render backend
+API_BASE = get_setting("API_BASE", "https://hospital-backend-kyay.onrender.com").rstrip("/")
+# Read calls are shared across reruns and sessions for this long
+CACHE_TTL_SECONDS = int(get_setting("CACHE_TTL_SECONDS", 60))
+# Model status is cached briefly, so predictions pick up a newly trained model within this long
+MODEL_STATUS_TTL_SECONDS = int(get_setting("MODEL_STATUS_TTL_SECONDS", 10))
+# Generous, since the free-tier backend can take ~30s to wake up
+REQUEST_TIMEOUT_SECONDS = 60
+
+@st.cache_resource
+def get_session():
+    """One pooled keep-alive session per server process, reused by every rerun."""
+    session = requests.Session()
+    # Only idempotent requests are retried, so a patient is never posted twice
+    retry = Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_json(path):
+    response = get_session().get(f"{API_BASE}{path}", timeout=REQUEST_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response.json()
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def fetch_json(path):
+    """GET one path. Failures raise, so they are never cached."""
+    return get_json(path)
+
+@st.cache_data(ttl=MODEL_STATUS_TTL_SECONDS, show_spinner=False)
+def fetch_model_status():
+    """The served model's /model/status, on a short TTL so a retrain shows up quickly. Failures raise."""
+    return get_json("/model/status")
+
+def fetch_concurrently(*fetches):
+    """Run independent cached fetches at once; each result is the value, or the exception it raised."""
+    with ThreadPoolExecutor(max_workers=len(fetches)) as pool:
+        futures = [pool.submit(fetch) for fetch in fetches]
+    return [future.exception() or future.result() for future in futures]
+
+def served_model_version():
+    # None (the rule-based score) when no model is trained or the status can't be fetched
+    try:
+        model_status = fetch_model_status()
+    except (requests.RequestException, ValueError):
+        return None
+    return model_status["version"] if model_status.get("is_trained") else None
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def predict_no_show(patient_data, model_version):
+    # Same inputs and model, same answer: repeated submissions don't reach the backend.
+    # model_version is only part of the cache key, so a newly published model is asked afresh
+    response = get_session().post(f"{API_BASE}/predict-no-show/", json={"patient_data": patient_data},
+                                  timeout=REQUEST_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response.json()
 
 st.title("🏥 Intelligent Hospital Management System")
 st.subheader("Based on Kiambu Level 5 Hospital Research - LIVE VERSION")
@@ -26,46 +93,53 @@ if page == "Dashboard":
     st.header("Hospital Analytics Dashboard")
     
     try:
-        response = requests.get(f"{API_BASE}/analytics/dashboard")
-        if response.status_code == 200:
-            data = response.json()
-            
-            if "message" in data and data["message"] == "No data available":
-                st.warning("No patient data available yet. Please add patients in the Patient Management section.")
-            else:
-                # Key metrics
-                col1, col2, col3, col4 = st.columns(4)
-                
-                with col1:
-                    st.metric("Total Patients", data.get('total_patients', 0))
-                with col2:
-                    st.metric("High Risk Patients", data.get('high_risk_patients', 0))
-                with col3:
-                    st.metric("High Risk %", f"{data.get('high_risk_percentage', 0):.1f}%")
-                with col4:
-                    avg_sat = data.get('average_satisfaction_scores', {})
-                    overall_avg = sum(avg_sat.values()) / len(avg_sat) if avg_sat else 0
-                    st.metric("Avg Satisfaction", f"{overall_avg:.1f}%")
-                
-                # Satisfaction scores chart
-                st.subheader("Patient Satisfaction Scores")
-                if data.get('average_satisfaction_scores'):
-                    sat_data = data['average_satisfaction_scores']
-                    fig = px.bar(
-                        x=list(sat_data.keys()),
-                        y=list(sat_data.values()),
-                        title="Average Satisfaction Scores by Dimension",
-                        labels={'x': 'Satisfaction Dimension', 'y': 'Score (%)'}
-                    )
-                    st.plotly_chart(fig)
-                
-                # Research insights
-                st.subheader("Key Research Insights from Kiambu Study")
-                insights = data.get('research_based_insights', {})
-                for insight, value in insights.items():
-                    st.info(f"**{insight.replace('_', ' ').title()}**: {value}")
+        data, model_status = fetch_concurrently(lambda: fetch_json("/analytics/dashboard"), fetch_model_status)
+        if isinstance(data, Exception):
+            raise data
+        # The dashboard still renders when model status is unavailable
+        if isinstance(model_status, Exception):
+            model_status = None
+        if "message" in data and data["message"] == "No data available":
+            st.warning("No patient data available yet. Please add patients in the Patient Management section.")
         else:
-            st.error("Could not fetch dashboard data")
+            # Key metrics
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.metric("Total Patients", data.get('total_patients', 0))
+            with col2:
+                st.metric("High Risk Patients", data.get('high_risk_patients', 0))
+            with col3:
+                st.metric("High Risk %", f"{data.get('high_risk_percentage', 0):.1f}%")
+            with col4:
+                avg_sat = data.get('average_satisfaction_scores', {})
+                overall_avg = sum(avg_sat.values()) / len(avg_sat) if avg_sat else 0
+                st.metric("Avg Satisfaction", f"{overall_avg:.1f}%")
+            
+            if model_status is None:
+                st.caption("Prediction model status is unavailable")
+            elif model_status.get("is_trained"):
+                st.caption(f"Prediction model v{model_status['version']}, trained on {model_status['training_rows']} patients")
+            
+            # Satisfaction scores chart
+            st.subheader("Patient Satisfaction Scores")
+            if data.get('average_satisfaction_scores'):
+                sat_data = data['average_satisfaction_scores']
+                fig = px.bar(
+                    x=list(sat_data.keys()),
+                    y=list(sat_data.values()),
+                    title="Average Satisfaction Scores by Dimension",
+                    labels={'x': 'Satisfaction Dimension', 'y': 'Score (%)'}
+                )
+                st.plotly_chart(fig)
+            
+            # Research insights
+            st.subheader("Key Research Insights from Kiambu Study")
+            insights = data.get('research_based_insights', {})
+            for insight, value in insights.items():
+                st.info(f"**{insight.replace('_', ' ').title()}**: {value}")
+    except requests.HTTPError:
+        st.error("Could not fetch dashboard data")
     except Exception as e:
         st.error(f"Backend connection failed: {str(e)}")
         st.info("Note: The backend might be waking up from sleep. Please wait 30 seconds and refresh.")
@@ -112,11 +186,15 @@ elif page == "Patient Management":
             }
             
             try:
-                response = requests.post(f"{API_BASE}/patients/", json=patient_data)
+                response = get_session().post(f"{API_BASE}/patients/", json=patient_data, timeout=REQUEST_TIMEOUT_SECONDS)
                 if response.status_code == 200:
                     patient = response.json()
+                    # The cached analytics and predictions no longer reflect this patient
+                    fetch_json.clear()
+                    fetch_model_status.clear()
+                    predict_no_show.clear()
                     st.success(f"Patient added successfully! No-Show Probability: {patient['no_show_probability']:.1%}")
-                    st.info("Refresh the Dashboard to see updated analytics")
+                    st.info("The Dashboard now includes this patient")
                 else:
                     st.error("Failed to add patient - backend may be waking up")
             except Exception as e:
@@ -164,45 +242,43 @@ elif page == "Predictions":
             }
             
             try:
-                response = requests.post(f"{API_BASE}/predict-no-show/", json={"patient_data": patient_data})
-                if response.status_code == 200:
-                    prediction = response.json()
-                    
-                    # Display results
-                    st.subheader("Prediction Results")
-                    
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        risk_color = "red" if prediction["risk_level"] == "High" else "orange" if prediction["risk_level"] == "Medium" else "green"
-                        st.metric("No-Show Probability", f"{prediction['no_show_probability']:.1%}")
-                        st.metric("Risk Level", prediction["risk_level"])
-                    
-                    with col2:
-                        st.subheader("Recommended Actions")
-                        for action in prediction["recommended_actions"]:
-                            st.write(f"• {action}")
-                    
-                    # Risk gauge chart
-                    fig = go.Figure(go.Indicator(
-                        mode = "gauge+number+delta",
-                        value = prediction['no_show_probability'] * 100,
-                        domain = {'x': [0, 1], 'y': [0, 1]},
-                        title = {'text': "No-Show Risk Score"},
-                        gauge = {
-                            'axis': {'range': [None, 100]},
-                            'bar': {'color': risk_color},
-                            'steps': [
-                                {'range': [0, 40], 'color': "lightgreen"},
-                                {'range': [40, 70], 'color': "yellow"},
-                                {'range': [70, 100], 'color': "red"}
-                            ]
-                        }
-                    ))
-                    st.plotly_chart(fig)
-                    
-                else:
-                    st.error("Prediction failed - backend may be waking up")
+                prediction = predict_no_show(patient_data, served_model_version())
+                
+                # Display results
+                st.subheader("Prediction Results")
+                
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    risk_color = "red" if prediction["risk_level"] == "High" else "orange" if prediction["risk_level"] == "Medium" else "green"
+                    st.metric("No-Show Probability", f"{prediction['no_show_probability']:.1%}")
+                    st.metric("Risk Level", prediction["risk_level"])
+                
+                with col2:
+                    st.subheader("Recommended Actions")
+                    for action in prediction["recommended_actions"]:
+                        st.write(f"• {action}")
+                
+                # Risk gauge chart
+                fig = go.Figure(go.Indicator(
+                    mode = "gauge+number+delta",
+                    value = prediction['no_show_probability'] * 100,
+                    domain = {'x': [0, 1], 'y': [0, 1]},
+                    title = {'text': "No-Show Risk Score"},
+                    gauge = {
+                        'axis': {'range': [None, 100]},
+                        'bar': {'color': risk_color},
+                        'steps': [
+                            {'range': [0, 40], 'color': "lightgreen"},
+                            {'range': [40, 70], 'color': "yellow"},
+                            {'range': [70, 100], 'color': "red"}
+                        ]
+                    }
+                ))
+                st.plotly_chart(fig)
+                
+            except requests.HTTPError:
+                st.error("Prediction failed - backend may be waking up")
             except Exception as e:
                 st.error(f"Backend connection failed: {str(e)}")
 